@@ -6,7 +6,24 @@ import numpy as np
 from datetime import datetime, timedelta
 from google.oauth2.service_account import Credentials
 from gspread.exceptions import SpreadsheetNotFound
+import os
+import hashlib
+import hmac
+import logging
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from sales_pipeline import SalesRefresher, SalesSheetSync, data_version, index_by_date, meses_ordem, slice_month
+from snapshot_store import SnapshotStore
+from data_store import SharedDataStore
+from data_sources import make_data_source
+from datasets import load_datasets, month_totals
+from rollups import SalesRollup
+from forecasting import SalesForecaster
+from chart_cache import ChartSpecCache
+from chart_transport import compact_frame, day_expression, month_chart_data, projection_chart_data
+from calendar_grid import DIAS_CURTOS, activity_levels, build_calendar_grid, month_bounds, year_bounds
+from summary_render import format_brl_series, render_summary_list, year_over_year
+from instrumentation import MetricsStore, RunProfiler, configure_metrics_log
 
 # Suprimir warnings específicos do pandas
 warnings.filterwarnings("ignore", category=FutureWarning, message=".*observed=False.*")
@@ -15,6 +32,14 @@ warnings.filterwarnings("ignore", category=FutureWarning, message=".*observed=Fa
 SPREADSHEET_ID = "1NTScbiIna-iE7roQ9XBdjUOssRihTFFby4INAAQNXTg"
 WORKSHEET_NAME = "Vendas"
 LOGO_URL = "https://raw.githubusercontent.com/lucasricardocs/clips_dashboard/main/logo.png"
+SNAPSHOT_DIR = ".cache"
+# Intervalo padrão da releitura em segundo plano (CLIPS_REFRESH_SECONDS ou refresh_seconds em [data_source])
+REFRESH_SECONDS = 300
+# Painel de diagnóstico: ?admin=<chave>, só com CLIPS_ADMIN_KEY definida
+ADMIN_KEY_ENV = "CLIPS_ADMIN_KEY"
+# Rótulo da visão consolidada quando há mais de uma loja configurada
+TODAS_LOJAS = "Todas as lojas"
+LOJA_PADRAO = "Clips Burger"
 
 # Configuração da página Streamlit
 st.set_page_config(
@@ -24,15 +49,13 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Configuração de tema para gráficos
-alt.data_transformers.enable("json")
-alt.data_transformers.disable_max_rows()
+# Dados dos gráficos vão embutidos na spec, já projetados e compactados (chart_transport)
+logger = logging.getLogger(__name__)
 
 # Paleta de cores para modo escuro
 CORES_MODO_ESCURO = ["#4c78a8", "#54a24b", "#f58518", "#e45756", "#72b7b2", "#ff9da6", "#9d755d", "#bab0ac"]
 
 # Ordem dos meses
-meses_ordem = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
 meses_dict = {nome: i+1 for i, nome in enumerate(meses_ordem)}
 
 # --- CSS Customizado Melhorado com Animação de Fogo ---
@@ -527,6 +550,19 @@ def inject_enhanced_mobile_css():
             text-shadow: 0 1px 2px rgba(0, 0, 0, 0.2);
         }
 
+        .monthly-summary-delta {
+            display: inline-block;
+            min-width: 4.5rem;
+            margin-left: 0.75rem;
+            font-size: 0.85rem;
+            font-weight: 600;
+            text-align: right;
+        }
+
+        .monthly-summary-delta.positivo { color: #4ade80; }
+        .monthly-summary-delta.negativo { color: #f87171; }
+        .monthly-summary-delta.neutro { color: #94a3b8; }
+
         /* Chart containers melhorados */
         .stAltairChart {
             background: linear-gradient(135deg, #1e293b 0%, #334155 100%);
@@ -588,8 +624,6 @@ def inject_enhanced_mobile_css():
     </style>
     """, unsafe_allow_html=True)
 
-inject_enhanced_mobile_css()
-
 # --- Funções de Cache e Acesso ao Google Sheets ---
 @st.cache_resource
 def get_google_auth():
@@ -617,50 +651,129 @@ def get_google_auth():
         st.error(f"Erro geral de autenticação com Google: {e_auth}")
         return None
 
-@st.cache_data(ttl=600)
-def read_sales_data(_gc):
-    """Lê e processa os dados da planilha."""
-    if not _gc:
-        return pd.DataFrame()
+def parse_source_spec(spec):
+    """Converte "tipo:valor" das variáveis de ambiente em configuração de fonte.
+
+    csv/sqlite: o valor é o caminho ("csv:dados/vendas.csv"). sheets: o valor é o id da
+    planilha, com a aba opcional após "/" ("sheets:<id>/Vendas").
+    """
+    kind, _, value = spec.strip().partition(":")
+    kind = kind.strip()
+    if kind == "sheets":
+        spreadsheet_id, _, worksheet = value.partition("/")
+        if not spreadsheet_id.strip():
+            raise ValueError(f"Fonte {spec!r} sem o id da planilha (use sheets:<id> ou sheets:<id>/<aba>).")
+        config = {"type": "sheets", "spreadsheet_id": spreadsheet_id.strip()}
+        if worksheet.strip():
+            config["worksheet"] = worksheet.strip()
+        return config
+    return {"type": kind, "path": value}
+
+def get_data_source_config():
+    """Configuração da fonte de vendas: variável CLIPS_DATA_SOURCE, seção [data_source] dos secrets ou Google Sheets."""
+    env_config = os.environ.get("CLIPS_DATA_SOURCE")
+    if env_config:
+        # Formato "tipo:valor" (ver parse_source_spec), ex.: "csv:dados/vendas.csv" ou "sheets:<id>/Vendas"
+        return parse_source_spec(env_config)
     try:
-        spreadsheet = _gc.open_by_key(SPREADSHEET_ID)
-        worksheet = spreadsheet.worksheet(WORKSHEET_NAME)
-        rows = worksheet.get_all_records()
-        if not rows:
-            return pd.DataFrame()
-
-        df = pd.DataFrame(rows)
-        
-        # Processamento e limpeza
-        for col in ["Cartão", "Dinheiro", "Pix"]:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
-            else:
-                df[col] = 0
-
-        if "Data" not in df.columns:
-            st.error("Coluna 'Data' não encontrada na planilha!")
-            return pd.DataFrame()
+        if "data_source" in st.secrets:
+            return dict(st.secrets["data_source"])
+    except FileNotFoundError:
+        pass
+    return {"type": "sheets", "spreadsheet_id": SPREADSHEET_ID, "worksheet": WORKSHEET_NAME}
+
+def get_stores_config():
+    """Lojas: variável CLIPS_STORES, lista [[stores]] dos secrets ou uma loja com a fonte de get_data_source_config.
+
+    Cada loja tem `name` e os mesmos campos de [data_source] (planilha, aba ou arquivo próprios).
+    """
+    env_stores = os.environ.get("CLIPS_STORES")
+    if env_stores:
+        # Formato "Nome=tipo:valor;..." (ver parse_source_spec), ex.: "Centro=csv:centro.csv;Bairro=sheets:<id>/Vendas"
+        stores = []
+        for item in filter(None, env_stores.split(";")):
+            name, _, spec = item.partition("=")
+            stores.append({"name": name.strip(), **parse_source_spec(spec)})
+        return stores
+    try:
+        if "stores" in st.secrets:
+            return [dict(store) for store in st.secrets["stores"]]
+    except FileNotFoundError:
+        pass
+    return [{"name": LOJA_PADRAO, **get_data_source_config()}]
 
-        try:
-            df["Data"] = pd.to_datetime(df["Data"], format="%d/%m/%Y", errors="coerce")
-            if df["Data"].isnull().any():
-                df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-        except Exception:
-            df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
+@st.cache_resource
+def get_store_sources():
+    """Fonte de dados de cada loja configurada, na ordem da configuração."""
+    return {store["name"]: make_sales_source(store) for store in get_stores_config()}
+
+def make_sales_source(config):
+    """Fonte de dados de vendas de uma loja (ou da configuração única)."""
+    config = {k: v for k, v in config.items() if k != "name"}
+    config.setdefault("spreadsheet_id", SPREADSHEET_ID)
+    config.setdefault("worksheet", WORKSHEET_NAME)
+    uses_sheets = config.get("type", "sheets") == "sheets" or any(
+        archive.get("type", config.get("type", "sheets")) == "sheets" for archive in config.get("archives", [])
+    )
+    gc = get_google_auth() if uses_sheets else None
+    return make_data_source(config, gc)
+
+def get_datasets_config():
+    """Conjuntos complementares (custos, compras...) da lista [[datasets]] dos secrets."""
+    try:
+        return [dict(config) for config in st.secrets.get("datasets", [])]
+    except FileNotFoundError:
+        return []
+
+@st.cache_data(ttl=REFRESH_SECONDS, show_spinner=False)
+def get_extra_datasets():
+    """Custos, compras e demais abas configuradas, lidos em paralelo (um batch get por planilha)."""
+    configs = get_datasets_config()
+    if not configs:
+        return None
+    gc = get_google_auth() if any(c.get("type", "sheets") == "sheets" for c in configs) else None
+    bundle = load_datasets(configs, gc)
+    for timing in bundle.timings:
+        if timing.error:
+            logger.warning("Falha ao ler o conjunto %s: %s", timing.name, timing.error)
+    return bundle
 
-        df.dropna(subset=["Data"], inplace=True)
-        if df.empty:
-            return pd.DataFrame()
+@st.cache_resource
+def get_sales_sync(source_key):
+    """Estado da sincronização incremental da fonte, compartilhado entre reruns."""
+    snapshot = SnapshotStore(os.path.join(SNAPSHOT_DIR, f"vendas_{source_key}.feather"))
+    return SalesSheetSync(snapshot=snapshot)
 
-        df["Total"] = df["Cartão"] + df["Dinheiro"] + df["Pix"]
-        df["Ano"] = df["Data"].dt.year
-        df["Mês"] = df["Data"].dt.month
-        df["Dia"] = df["Data"].dt.day
-        df["MêsNome"] = df["Mês"].apply(lambda x: meses_ordem[int(x)-1] if pd.notna(x) and 1 <= int(x) <= 12 else "Inválido")
-        df["DiaSemana"] = df["Data"].dt.dayofweek
+@st.cache_resource
+def get_data_store(source_key):
+    """Versões dos dados da fonte compartilhadas (sem cópia) por todas as sessões."""
+    return SharedDataStore()
 
-        return df.sort_values("Data")
+@st.cache_resource
+def get_sales_refresher(source_key, _source):
+    """Thread que relê a fonte periodicamente e troca o DataFrame servido às sessões.
+
+    O intervalo vem da configuração da loja; sem ele, de CLIPS_REFRESH_SECONDS ou de [data_source].
+    """
+    interval = (
+        _source.refresh_seconds
+        or os.environ.get("CLIPS_REFRESH_SECONDS")
+        or get_data_source_config().get("refresh_seconds", REFRESH_SECONDS)
+    )
+    return SalesRefresher(get_sales_sync(source_key), _source, interval=float(interval))
+
+def read_sales_data(source):
+    """Retorna os dados de vendas já carregados; a fonte é relida em segundo plano (stale-while-revalidate)."""
+    if not source:
+        return pd.DataFrame()
+    try:
+        sync = get_sales_sync(source.cache_key)
+        if sync.as_of is None:
+            # Primeira carga sem snapshot em disco: única leitura feita no caminho da requisição
+            sync.sync(source)
+        get_sales_refresher(source.cache_key, source).start()
+        store = get_data_store(source.cache_key)
+        return store.view(store.publish(sync.frame, sync.as_of))
 
     except SpreadsheetNotFound:
         st.error(f"Planilha com ID '{SPREADSHEET_ID}' não encontrada.")
@@ -669,6 +782,49 @@ def read_sales_data(_gc):
         st.error(f"Erro ao ler ou processar dados da planilha: {e}")
         return pd.DataFrame()
 
+def read_stores_data(sources):
+    """Dados de cada loja; as que ainda não têm dados em memória são lidas da fonte em paralelo."""
+    syncs = {name: get_sales_sync(source.cache_key) for name, source in sources.items() if source}
+    cold = [(syncs[name], sources[name]) for name in syncs if syncs[name].as_of is None]
+    if len(cold) > 1:
+        # Partida a frio limitada pela loja mais lenta; erros reaparecem na leitura abaixo
+        def sync_quietly(item):
+            try:
+                item[0].sync(item[1])
+            except Exception:
+                logger.exception("Falha na carga inicial de uma das lojas.")
+        with ThreadPoolExecutor(max_workers=min(8, len(cold)), thread_name_prefix="carga-loja") as pool:
+            list(pool.map(sync_quietly, cold))
+    return {name: read_sales_data(source) for name, source in sources.items()}
+
+# Uma ou duas versões por loja ficam em memória
+@st.cache_resource(max_entries=16)
+def get_sales_rollup(version, _df):
+    """Cubo de agregados (dia/semana/mês/ano), construído uma vez por versão dos dados."""
+    return SalesRollup(_df)
+
+@st.cache_resource(max_entries=2)
+def get_consolidated_frame(versions, _frames):
+    """Vendas de todas as lojas em um DataFrame (coluna Loja), montado uma vez por combinação de versões."""
+    parts = []
+    for name, df in _frames.items():
+        if not df.empty:
+            parts.append(df.assign(Loja=name))
+    df = index_by_date(pd.concat(parts).sort_values("Data", kind="stable"))
+    df["Loja"] = pd.Categorical(df["Loja"], categories=list(_frames))
+    df.attrs["data_version"] = hashlib.md5("|".join(versions).encode()).hexdigest()[:16]
+    return df
+
+@st.cache_resource(max_entries=2)
+def get_consolidated_rollup(versions, _rollups):
+    """Cubo consolidado das lojas, combinado a partir dos cubos de cada uma."""
+    return SalesRollup.combine(_rollups)
+
+@st.cache_resource(max_entries=16)
+def get_sales_forecast(version, _rollup):
+    """Projeção de vendas (perfil semanal × nível recente), ajustada uma vez por versão dos dados."""
+    return SalesForecaster(_rollup.daily["Total"])
+
 # --- Função para criar heatmap mensal estilo GitHub ---
 def create_monthly_activity_heatmap(df_month, mes_nome, ano):
     """Cria um heatmap estilo GitHub para o mês selecionado."""
@@ -676,82 +832,25 @@ def create_monthly_activity_heatmap(df_month, mes_nome, ano):
         return None
     
     try:
-        # Obter o primeiro e último dia do mês
-        primeiro_dia = datetime(ano, df_month['Mês'].iloc[0], 1)
-        if df_month['Mês'].iloc[0] == 12:
-            ultimo_dia = datetime(ano + 1, 1, 1) - timedelta(days=1)
-        else:
-            ultimo_dia = datetime(ano, df_month['Mês'].iloc[0] + 1, 1) - timedelta(days=1)
-        
-        # Obter o dia da semana do primeiro dia do mês (0=segunda, 6=domingo)
-        first_day_weekday = primeiro_dia.weekday()
-        
-        # Calcular quantos dias antes do primeiro dia precisamos para começar na segunda-feira
-        days_before = first_day_weekday
-        
-        # Criar range de datas começando na segunda-feira da semana do primeiro dia
-        start_date = primeiro_dia - pd.Timedelta(days=days_before)
-        
-        # Garantir que terminamos no domingo da última semana
-        days_after = 6 - ultimo_dia.weekday()
-        if days_after < 6:
-            end_date = ultimo_dia + pd.Timedelta(days=days_after)
-        else:
-            end_date = ultimo_dia
-        
-        all_dates = pd.date_range(start=start_date, end=end_date, freq='D')
-        
-        # DataFrame com todas as datas
-        full_df = pd.DataFrame({'Data': all_dates})
-        
-        # Marcar quais datas são do mês atual
-        full_df['is_current_month'] = (
-            (full_df['Data'].dt.year == ano) & 
-            (full_df['Data'].dt.month == df_month['Mês'].iloc[0])
-        )
-        
-        # Merge com dados de vendas
-        cols_to_merge = ['Data', 'Total']
-        if 'Cartão' in df_month.columns:
-            cols_to_merge.append('Cartão')
-        if 'Dinheiro' in df_month.columns:
-            cols_to_merge.append('Dinheiro')
-        if 'Pix' in df_month.columns:
-            cols_to_merge.append('Pix')
-        
-        cols_present = [col for col in cols_to_merge if col in df_month.columns]
-        full_df = full_df.merge(df_month[cols_present], on='Data', how='left')
-        
-        # Preencher NaNs
+        # Grade semana × dia da semana montada com aritmética de datas do NumPy
+        inicio, fim = month_bounds(ano, df_month['Mês'].iloc[0])
+        value_cols = [col for col in ['Total', 'Cartão', 'Dinheiro', 'Pix'] if col in df_month.columns]
+        full_df = build_calendar_grid(df_month['Data'], df_month[value_cols], inicio, fim)
         for col in ['Total', 'Cartão', 'Dinheiro', 'Pix']:
-            if col in full_df.columns:
-                full_df[col] = full_df[col].fillna(0)
-            else:
-                full_df[col] = 0
-        
+            if col not in full_df.columns:
+                full_df[col] = 0.0
+
         # Para dias que não são do mês atual, definir como None
-        full_df['display_total'] = full_df['Total'].copy()
-        mask_not_current_month = ~full_df['is_current_month']
-        full_df.loc[mask_not_current_month, 'display_total'] = None
-
-        # Mapear os nomes dos dias
-        full_df['day_of_week'] = full_df['Data'].dt.weekday
-        day_name_map = {0: 'Seg', 1: 'Ter', 2: 'Qua', 3: 'Qui', 4: 'Sex', 5: 'Sáb', 6: 'Dom'}
-        full_df['day_display_name'] = full_df['day_of_week'].map(day_name_map)
-        
-        # Ordem fixa dos dias
-        day_display_names = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
-        
-        # Calcular semana
-        full_df['week_corrected'] = ((full_df['Data'] - start_date).dt.days // 7)
+        full_df['display_total'] = full_df['Total'].where(full_df['no_periodo'])
+        # Deslocamento em dias a partir do dia 1 (negativo antes do mês), no lugar da data
+        full_df['o'] = (full_df['Data'] - pd.Timestamp(inicio)).dt.days + 1
 
-        # Criar labels das semanas
-        week_labels = full_df.groupby('week_corrected').agg(
-            start_date=('Data', 'min')
-        ).reset_index()
-        week_labels['week_label'] = 'S' + (week_labels['week_corrected'] + 1).astype(str)
+        # Ordem fixa dos dias
+        day_display_names = DIAS_CURTOS
 
         # Labels das semanas
+        n_weeks = int(full_df['semana'].iloc[-1]) + 1
+        week_labels = pd.DataFrame({'semana': range(n_weeks), 'week_label': [f'S{i + 1}' for i in range(n_weeks)]})
         weeks_chart = alt.Chart(week_labels).mark_text(
             align='center',
             baseline='bottom',
@@ -759,45 +858,52 @@ def create_monthly_activity_heatmap(df_month, mes_nome, ano):
             dy=-5,
             color='#cbd5e1'
         ).encode(
-            x=alt.X('week_corrected:O', axis=None),
+            x=alt.X('semana:O', axis=None),
             text='week_label:N'
         )
 
         # Tooltip
         tooltip_fields = [
             alt.Tooltip('Data:T', title='Data', format='%d/%m/%Y'),
-            alt.Tooltip('day_display_name:N', title='Dia'),
+            alt.Tooltip('dia_nome:N', title='Dia'),
             alt.Tooltip('Total:Q', title='Total Vendas (R$)', format=',.2f')
         ]
-        
-        if full_df['Cartão'].sum() > 0:
+        fields = ['semana', 'dia_nome', 'o', 'display_total', 'Total']
+
+        col_sums = full_df[['Cartão', 'Dinheiro', 'Pix']].sum()
+        if col_sums['Cartão'] > 0:
             tooltip_fields.append(alt.Tooltip('Cartão:Q', title='Cartão (R$)', format=',.2f'))
-        if full_df['Dinheiro'].sum() > 0:
+            fields.append('Cartão')
+        if col_sums['Dinheiro'] > 0:
             tooltip_fields.append(alt.Tooltip('Dinheiro:Q', title='Dinheiro (R$)', format=',.2f'))
-        if full_df['Pix'].sum() > 0:
+            fields.append('Dinheiro')
+        if col_sums['Pix'] > 0:
             tooltip_fields.append(alt.Tooltip('Pix:Q', title='Pix (R$)', format=',.2f'))
+            fields.append('Pix')
 
         # Domínio da escala baseado nos dados do mês
-        max_value = full_df[full_df['is_current_month']]['Total'].max()
+        max_value = full_df['display_total'].max()
         if pd.isna(max_value) or max_value == 0:
             domain_values = [0.01, 1500, 2500, 3000]
         else:
             domain_values = [0.01, max_value * 0.25, max_value * 0.5, max_value * 0.75]
 
-        # Heatmap principal
-        heatmap = alt.Chart(full_df).mark_rect(
+        # Heatmap principal (só as colunas codificadas vão para o navegador)
+        heatmap = alt.Chart(compact_frame(full_df, fields)).transform_calculate(
+            Data=day_expression(ano, df_month['Mês'].iloc[0], field='o')
+        ).mark_rect(
             stroke='#475569',
             strokeWidth=3,
             cornerRadius=3
         ).encode(
-            x=alt.X('week_corrected:O',
+            x=alt.X('semana:O',
                     title=None, 
                     axis=alt.Axis(
                         labelColor='#cbd5e1',
                         titleColor='#f1f5f9',
                         grid=False
                     )),
-            y=alt.Y('day_display_name:N', 
+            y=alt.Y('dia_nome:N', 
                     sort=day_display_names,
                     title=None,
                     axis=alt.Axis(
@@ -851,17 +957,113 @@ def create_monthly_activity_heatmap(df_month, mes_nome, ano):
         st.error(f"Erro ao criar heatmap mensal: {e}")
         return None
 
+# --- Função para criar heatmap anual (vários anos) estilo GitHub ---
+def create_annual_activity_heatmap(daily, anos):
+    """Heatmap estilo GitHub com um ano por linha, a partir dos totais diários do cubo."""
+    if daily.empty or not anos:
+        return None
+
+    try:
+        # Uma célula por dia; a data vai como deslocamento inteiro desde 1º de janeiro
+        blocos = []
+        for ano in sorted(anos):
+            inicio, fim = year_bounds(ano)
+            grid = build_calendar_grid(daily.index, daily[['Total']], inicio, fim)
+            grid = grid[grid['no_periodo']]
+            blocos.append(pd.DataFrame({
+                'a': np.int16(ano),
+                'o': np.arange(len(grid), dtype=np.int16),
+                's': grid['semana'].to_numpy(dtype=np.int8),
+                'd': grid['dia_semana'].to_numpy(dtype=np.int8),
+                't': grid['Total'].to_numpy(),
+            }))
+        cells = pd.concat(blocos, ignore_index=True)
+
+        # Faixas de cor decididas no servidor: o navegador recebe só o nível (0 a 4)
+        levels, thresholds = activity_levels(cells['t'])
+        cells['n'] = levels
+        cells['t'] = cells['t'].round().astype(np.int32)
+
+        limites = [f"R$ {v:,.0f}".replace(",", ".") for v in thresholds]
+        faixas = ["Sem vendas"]
+        if limites:
+            faixas.append(f"até {limites[0]}")
+            faixas += [f"{a} a {b}" for a, b in zip(limites, limites[1:])]
+            faixas.append(f"acima de {limites[-1]}")
+        else:
+            faixas.append("Com vendas")
+        cores = ['#e5e7eb', '#bbf7d0', '#86efac', '#22c55e', '#15803d'][:len(faixas)]
+
+        heatmap = alt.Chart(cells).transform_calculate(
+            Data="datetime(datum.a, 0, 1 + datum.o)"
+        ).mark_rect(
+            stroke='#475569',
+            strokeWidth=1,
+            cornerRadius=2
+        ).encode(
+            x=alt.X('s:O', title=None, axis=None),
+            y=alt.Y('d:O',
+                    title=None,
+                    axis=alt.Axis(
+                        values=[0, 2, 4],
+                        labelExpr=f"{DIAS_CURTOS}[datum.value]",
+                        labelFontSize=9,
+                        ticks=False,
+                        domain=False,
+                        labelColor='#cbd5e1'
+                    )),
+            row=alt.Row('a:O', title=None, header=alt.Header(labelColor='#f1f5f9', labelFontSize=12, labelAngle=0)),
+            color=alt.Color('n:O',
+                scale=alt.Scale(domain=list(range(len(faixas))), range=cores),
+                legend=alt.Legend(
+                    title=None,
+                    labelColor='#cbd5e1',
+                    orient='bottom',
+                    labelExpr=f"{faixas}[datum.value]"
+                )),
+            tooltip=[
+                alt.Tooltip('Data:T', title='Data', format='%d/%m/%Y'),
+                alt.Tooltip('t:Q', title='Total Vendas (R$)', format=',.0f')
+            ]
+        ).properties(
+            width=alt.Step(9),
+            height=alt.Step(9)
+        ).configure_view(
+            strokeWidth=0
+        ).configure(
+            background='transparent'
+        )
+
+        return heatmap
+
+    except Exception as e:
+        st.error(f"Erro ao criar heatmap anual: {e}")
+        return None
+
 # --- Funções de Gráficos ---
-def create_cumulative_chart_mobile(df_month):
-    """Gráfico de área acumulado para o mês selecionado."""
+def create_cumulative_chart_mobile(df_chart, ano, mes, df_projecao=None):
+    """Gráfico de área acumulado para o mês selecionado, a partir do dataset compacto do mês.
+
+    Com `df_projecao` (projection_chart_data), a linha tracejada continua o acumulado até o
+    fim do mês e a faixa sombreada mostra o intervalo provável da projeção.
+    """
     try:
-        if df_month.empty:
+        if df_chart.empty:
             return None
         
-        df_month = df_month.copy().sort_values("Dia")
-        df_month["Total_Acumulado"] = df_month["Total"].cumsum()
-        
-        chart = alt.Chart(df_month).mark_area(
+        eixo_x = alt.X("Dia:O", 
+                       axis=alt.Axis(title="Dia do Mês", labelAngle=0, labelColor="#cbd5e1", 
+                                    titleColor="#f1f5f9", gridColor="#475569"))
+        eixo_y = alt.Axis(title="Acumulado (R$)", labelColor="#cbd5e1", 
+                          titleColor="#f1f5f9", gridColor="#475569")
+
+        # Acumulado e data calculados no navegador; só Dia e Total são enviados
+        chart = alt.Chart(df_chart).transform_window(
+            Total_Acumulado="sum(Total)",
+            sort=[alt.SortField("Dia")]
+        ).transform_calculate(
+            Data=day_expression(ano, mes)
+        ).mark_area(
             interpolate="monotone",
             line={"color": CORES_MODO_ESCURO[0], "strokeWidth": 2},
             color=alt.Gradient(
@@ -873,18 +1075,41 @@ def create_cumulative_chart_mobile(df_month):
                 x1=1, x2=1, y1=1, y2=0
             )
         ).encode(
-            x=alt.X("Dia:O", 
-                   axis=alt.Axis(title="Dia do Mês", labelAngle=0, labelColor="#cbd5e1", 
-                                titleColor="#f1f5f9", gridColor="#475569")),
-            y=alt.Y("Total_Acumulado:Q", 
-                   axis=alt.Axis(title="Acumulado (R$)", labelColor="#cbd5e1", 
-                                titleColor="#f1f5f9", gridColor="#475569")),
+            x=eixo_x,
+            y=alt.Y("Total_Acumulado:Q", axis=eixo_y),
             tooltip=[
                 alt.Tooltip("Data:T", title="Data", format="%d/%m/%Y"),
                 alt.Tooltip("Total:Q", title="Venda Dia (R$)", format=",.2f"),
                 alt.Tooltip("Total_Acumulado:Q", title="Acumulado (R$)", format=",.2f")
             ]
-        ).properties(
+        )
+
+        if df_projecao is not None and not df_projecao.empty:
+            projecao = alt.Chart(df_projecao).transform_calculate(
+                Data=day_expression(ano, mes)
+            )
+            faixa = projecao.mark_area(
+                color=CORES_MODO_ESCURO[2], opacity=0.2
+            ).encode(
+                x=eixo_x,
+                y=alt.Y("Inferior:Q", axis=eixo_y),
+                y2="Superior:Q"
+            )
+            linha = projecao.mark_line(
+                color=CORES_MODO_ESCURO[2], strokeDash=[6, 4], strokeWidth=2
+            ).encode(
+                x=eixo_x,
+                y=alt.Y("Previsto:Q", axis=eixo_y),
+                tooltip=[
+                    alt.Tooltip("Data:T", title="Data", format="%d/%m/%Y"),
+                    alt.Tooltip("Previsto:Q", title="Projeção (R$)", format=",.2f"),
+                    alt.Tooltip("Inferior:Q", title="Mínimo provável (R$)", format=",.2f"),
+                    alt.Tooltip("Superior:Q", title="Máximo provável (R$)", format=",.2f")
+                ]
+            )
+            chart = alt.layer(chart, faixa, linha)
+
+        return chart.properties(
             height=400,
             title=alt.TitleParams(text="Vendas Acumuladas do Mês", color="#f1f5f9")
         ).configure_view(
@@ -892,18 +1117,19 @@ def create_cumulative_chart_mobile(df_month):
         ).configure(
             background="transparent"
         )
-        return chart
     except Exception as e:
         st.error(f"Erro ao criar gráfico acumulado: {e}")
         return None
 
-def create_daily_sales_chart_mobile(df_month):
-    """Gráfico de barras de vendas diárias para o mês selecionado."""
+def create_daily_sales_chart_mobile(df_chart, ano, mes):
+    """Gráfico de barras de vendas diárias para o mês selecionado, a partir do dataset compacto do mês."""
     try:
-        if df_month.empty:
+        if df_chart.empty:
             return None
         
-        chart = alt.Chart(df_month).mark_bar(
+        chart = alt.Chart(df_chart).transform_calculate(
+            Data=day_expression(ano, mes)
+        ).mark_bar(
             color=CORES_MODO_ESCURO[1], 
             size=15,
             stroke='#f0f0f0',
@@ -932,6 +1158,84 @@ def create_daily_sales_chart_mobile(df_month):
         st.error(f"Erro ao criar gráfico de vendas diárias: {e}")
         return None
 
+# --- Cache de Gráficos ---
+@st.cache_resource
+def get_chart_cache():
+    """Cache de specs Vega-Lite compartilhado entre sessões."""
+    return ChartSpecCache(max_entries=48)
+
+def render_cached_chart(chart_name, period, version, builder, profiler=None):
+    """Renderiza o gráfico a partir do cache; `builder` só é chamado em um miss. Retorna False se não houver gráfico."""
+    cache = get_chart_cache()
+    key = (chart_name, period, version)
+    profiler = profiler or RunProfiler()
+    with profiler.span(f"grafico:{chart_name}"):
+        hit = cache.payload_size(key) is not None
+        spec = cache.get_or_build(key, builder)
+        if spec is None:
+            return False
+        nbytes = cache.payload_size(key) or 0
+        logger.debug("Gráfico %s %s: %d bytes", chart_name, period, nbytes)
+        profiler.count("cache_graficos_hit" if hit else "cache_graficos_miss")
+        profiler.size(f"grafico:{chart_name}", nbytes)
+        st.vega_lite_chart(spec, use_container_width=True)
+    return True
+
+# --- Instrumentação e Painel de Diagnóstico ---
+@st.cache_resource
+def get_metrics_store():
+    """Tempos dos últimos reruns de todas as sessões."""
+    configure_metrics_log()
+    return MetricsStore()
+
+def admin_panel_enabled():
+    """Painel de diagnóstico só aparece com `?admin=<chave>` igual a CLIPS_ADMIN_KEY; sem a chave configurada, nunca."""
+    key = os.environ.get(ADMIN_KEY_ENV)
+    if not key:
+        return False
+    return hmac.compare_digest(st.query_params.get("admin", ""), key)
+
+def render_admin_panel(profiler, sources):
+    """Tempos por etapa, uso dos caches e memória dos dados (escondido; ver admin_panel_enabled)."""
+    metrics = get_metrics_store()
+    with st.expander("🛠️ Diagnóstico", expanded=True):
+        run = profiler.finish()
+        st.caption(f"Este rerun: {run['total_ms']:.0f} ms")
+        st.dataframe(
+            pd.DataFrame(sorted(run["spans"].items(), key=lambda item: -item[1]), columns=["etapa", "ms"]),
+            use_container_width=True, hide_index=True
+        )
+
+        st.markdown("**Últimos reruns (todas as sessões)**")
+        st.dataframe(pd.DataFrame(metrics.summary()), use_container_width=True, hide_index=True)
+
+        st.markdown("**Cache de gráficos**")
+        cache = get_chart_cache()
+        st.json({**cache.stats(), "contadores_reruns": metrics.counter_totals(), "bytes_este_rerun": run["bytes"]})
+
+        st.markdown("**Dados em memória**")
+        memoria = [
+            {"loja": name, **row}
+            for name, source in sources.items() if source
+            for row in get_data_store(source.cache_key).memory_report()
+        ]
+        st.dataframe(pd.DataFrame(memoria), use_container_width=True, hide_index=True)
+        st.markdown("**Fontes de dados**")
+        timings = [timing for source in sources.values() for timing in getattr(source, "timings", [])]
+        datasets = get_extra_datasets()
+        if datasets is not None:
+            timings += datasets.timings
+        if timings:
+            st.dataframe(pd.DataFrame([t._asdict() for t in timings]), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Nenhuma leitura concorrente registrada (sem arquivos nem conjuntos complementares).")
+        for name, source in sources.items():
+            if not source:
+                continue
+            refresher = get_sales_refresher(source.cache_key, source)
+            ultima = datetime.fromtimestamp(refresher.last_attempt).strftime("%d/%m/%Y %H:%M:%S") if refresher.last_attempt else "-"
+            st.caption(f"{name} · última releitura: {ultima} · erro: {refresher.last_error or 'nenhum'}")
+
 # --- Função para formatar moeda ---
 def format_brl(value):
     if pd.isna(value) or not isinstance(value, (int, float)):
@@ -940,14 +1244,35 @@ def format_brl(value):
 
 # --- Aplicação Principal ---
 def main():
-    # Autenticação e Leitura de Dados
-    gc = get_google_auth()
-    df_all = read_sales_data(gc)
-
-    if df_all.empty:
+    profiler = RunProfiler()
+    sources = {}
+    try:
+        with profiler.span("css"):
+            inject_enhanced_mobile_css()
+        # Autenticação e Leitura de Dados
+        with profiler.span("carga_dados"):
+            sources = get_store_sources()
+        render_dashboard(sources, profiler)
+    finally:
+        get_metrics_store().record(profiler.finish())
+    if admin_panel_enabled():
+        render_admin_panel(profiler, sources)
+
+def render_dashboard(sources, profiler):
+    with profiler.span("carga_dados"):
+        frames = read_stores_data(sources)
+
+    if all(df.empty for df in frames.values()):
         st.warning("Não foi possível carregar os dados da planilha ou ela está vazia.")
         return
 
+    syncs = {name: get_sales_sync(source.cache_key) for name, source in sources.items() if source}
+    for name, sync in syncs.items():
+        date_report = sync.date_report
+        if date_report and date_report.invalid:
+            origem = f" ({name})" if len(sources) > 1 else ""
+            st.caption(f"⚠️ {date_report.invalid} linha(s) da planilha{origem} com data em formato não reconhecido foram ignoradas.")
+
     # --- Logo com Animação de Fogo ---
     st.markdown(f"""
     <div class="logo-fire-container">
@@ -976,6 +1301,25 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+    # --- Filtro de Loja ---
+    lojas = [name for name, df in frames.items() if not df.empty]
+    if len(sources) > 1:
+        loja_selecionada = st.selectbox("Loja", [TODAS_LOJAS] + lojas)
+    else:
+        loja_selecionada = lojas[0]
+
+    with profiler.span("rollup"):
+        rollups = {name: get_sales_rollup(data_version(frames[name]), frames[name]) for name in lojas}
+        if loja_selecionada == TODAS_LOJAS:
+            versoes = tuple(data_version(frames[name]) for name in lojas)
+            df_all = get_consolidated_frame(versoes, {name: frames[name] for name in lojas})
+            rollup = get_consolidated_rollup(versoes, [rollups[name] for name in lojas])
+            lojas_exibidas = lojas
+        else:
+            df_all = frames[loja_selecionada]
+            rollup = rollups[loja_selecionada]
+            lojas_exibidas = [loja_selecionada]
+
     # --- Filtros de Mês e Ano ---
     anos_disponiveis = sorted(df_all["Ano"].unique(), reverse=True)
     meses_disponiveis = meses_ordem
@@ -1007,106 +1351,170 @@ def main():
 
     mes_selecionado_num = meses_dict[mes_selecionado_nome]
 
-    # Filtrar dados com base na seleção
-    df_filtered_year = df_all[df_all["Ano"] == ano_selecionado]
-    df_filtered_month = df_filtered_year[df_filtered_year["Mês"] == mes_selecionado_num]
+    # Filtrar dados com base na seleção (busca binária no índice de datas)
+    df_filtered_month = slice_month(df_all, ano_selecionado, mes_selecionado_num)
 
-    # --- Cálculo Vendas Semana Atual ---
-    hoje = datetime.now().date()
-    inicio_semana = hoje - timedelta(days=hoje.weekday())
-    fim_semana = inicio_semana + timedelta(days=6)
+    # Agregados consultados pelos KPIs, resumo mensal e gráficos
+    with profiler.span("rollup"):
+        primeiro_dia_mes = datetime(ano_selecionado, mes_selecionado_num, 1)
+        ultimo_dia_mes = (primeiro_dia_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        df_month_daily = rollup.days(primeiro_dia_mes, ultimo_dia_mes)
 
-    df_semana_atual = df_all[
-        (df_all['Data'].dt.date >= inicio_semana) &
-        (df_all['Data'].dt.date <= hoje)
-    ]
-    total_semana_atual = df_semana_atual["Total"].sum()
-
-    # --- Layout do Dashboard ---
+        # --- Cálculo Vendas Semana Atual ---
+        hoje = datetime.now().date()
+        inicio_semana = hoje - timedelta(days=hoje.weekday())
+        total_semana_atual = rollup.range_totals(inicio_semana, hoje)["Total"]
 
-    # KPI Vendas Semana Atual (em destaque)
-    st.metric(label="💰 Vendas Semana Atual (até hoje)", value=format_brl(total_semana_atual))
+    # Projeção ajustada uma vez por versão dos dados (fechamento da semana e do mês)
+    with profiler.span("projecao"):
+        previsao = get_sales_forecast(data_version(df_all), rollup)
+        projecao_semana = previsao.week_end(hoje)
+        projecao_mes = previsao.month_end(ano_selecionado, mes_selecionado_num)
 
-    # KPIs do Mês Selecionado
-    st.header(f"📊 Resumo de {mes_selecionado_nome} / {ano_selecionado}")
-    if not df_filtered_month.empty:
-        total_month = df_filtered_month["Total"].sum()
-        avg_daily_month = df_filtered_month["Total"].mean()
-        days_in_data = df_filtered_month["Dia"].nunique()
-    else:
-        total_month = 0
-        avg_daily_month = 0
-        days_in_data = 0
+    # --- Layout do Dashboard ---
 
-    kpi_cols = st.columns(2)
-    with kpi_cols[0]:
-        st.metric(label="Faturamento no Mês", value=format_brl(total_month))
-    with kpi_cols[1]:
-        st.metric(label="Média Diária no Mês", value=format_brl(avg_daily_month), 
-                 help=f"Baseado em {days_in_data} dias com vendas no mês.")
+    # KPI Vendas Semana Atual e KPIs do Mês Selecionado
+    with profiler.span("kpis"):
+        # KPI Vendas Semana Atual (em destaque)
+        ajuda_semana = f"Projeção para o fechamento da semana: {format_brl(projecao_semana['previsto'])}." if projecao_semana else None
+        st.metric(label="💰 Vendas Semana Atual (até hoje)", value=format_brl(total_semana_atual), help=ajuda_semana)
+        # Na visão consolidada vale a data da loja com os dados mais antigos
+        datas = [syncs[name].as_of for name in lojas_exibidas if syncs[name].as_of is not None]
+        if datas:
+            falhou = any(get_sales_refresher(sources[name].cache_key, sources[name]).last_error for name in lojas_exibidas)
+            falha = " · ⚠️ última atualização falhou" if falhou else ""
+            st.caption(f"🕒 Dados de {min(datas):%d/%m/%Y %H:%M}{falha}")
+
+        # KPIs do Mês Selecionado
+        st.header(f"📊 Resumo de {mes_selecionado_nome} / {ano_selecionado}")
+        month_stats = rollup.month(ano_selecionado, mes_selecionado_num)
+        if month_stats["registros"] > 0:
+            total_month = month_stats["Total"]
+            # Por dia com venda (na visão consolidada um dia tem uma linha por loja)
+            avg_daily_month = month_stats["Total"] / month_stats["dias"]
+            days_in_data = int(month_stats["dias"])
+        else:
+            total_month = 0
+            avg_daily_month = 0
+            days_in_data = 0
+
+        kpi_cols = st.columns(2)
+        with kpi_cols[0]:
+            st.metric(label="Faturamento no Mês", value=format_brl(total_month))
+        with kpi_cols[1]:
+            st.metric(label="Média Diária no Mês", value=format_brl(avg_daily_month), 
+                     help=f"Baseado em {days_in_data} dias com vendas no mês.")
+
+        # Custos e compras dos conjuntos complementares: valem para o negócio todo, não por loja
+        if loja_selecionada == TODAS_LOJAS or len(lojas) == 1:
+            datasets = get_extra_datasets()
+            saidas = month_totals(datasets.frames, ano_selecionado, mes_selecionado_num) if datasets is not None else {}
+            if saidas:
+                saida_cols = st.columns(len(saidas) + 1)
+                for col, (schema, valor) in zip(saida_cols, saidas.items()):
+                    with col:
+                        st.metric(label=f"{schema.capitalize()} no Mês", value=format_brl(valor))
+                with saida_cols[-1]:
+                    st.metric(label="Resultado do Mês", value=format_brl(total_month - sum(saidas.values())),
+                              help="Faturamento menos " + " e ".join(saidas) + " registrados no mês.")
+
+        # KPIs por loja na visão consolidada
+        if loja_selecionada == TODAS_LOJAS and len(lojas) > 1:
+            linhas = []
+            for name in lojas:
+                stats = rollups[name].month(ano_selecionado, mes_selecionado_num)
+                linhas.append({
+                    "Loja": name,
+                    "Semana Atual": format_brl(rollups[name].range_totals(inicio_semana, hoje)["Total"]),
+                    "Faturamento no Mês": format_brl(stats["Total"]),
+                    "Média Diária": format_brl(stats["Total"] / stats["dias"] if stats["dias"] > 0 else 0),
+                    "Participação": f"{stats['Total'] / total_month:.1%}".replace(".", ",") if total_month else "-",
+                })
+            st.dataframe(pd.DataFrame(linhas), use_container_width=True, hide_index=True)
 
     # --- Resumo Mensal do Ano Selecionado ---
-    st.header(f"🗓️ Faturamento Mensal ({ano_selecionado})")
-    if not df_filtered_year.empty:
-        monthly_revenue = df_filtered_year.groupby("Mês")["Total"].sum().reset_index()
-        monthly_revenue["MêsNome"] = monthly_revenue["Mês"].apply(
-            lambda x: meses_ordem[int(x)-1] if pd.notna(x) and 1 <= int(x) <= 12 else "Inválido"
-        )
-        monthly_revenue = monthly_revenue.set_index('Mês').reindex(range(1, 13)).reset_index()
-        monthly_revenue['MêsNome'] = monthly_revenue['Mês'].apply(lambda x: meses_ordem[x-1])
-        monthly_revenue['Total'] = monthly_revenue['Total'].fillna(0)
-
-        with st.container():
-             if not monthly_revenue.empty:
-                 for _, row in monthly_revenue.iterrows():
-                     st.markdown(f"""
-                     <div class="monthly-summary-item">
-                         <span class="monthly-summary-month">{row['MêsNome']}</span>
-                         <span class="monthly-summary-value">{format_brl(row['Total'])}</span>
-                     </div>
-                     """, unsafe_allow_html=True)
-             else:
-                 st.markdown('<div class="monthly-summary-item"><span>Nenhum dado para o ano.</span><span></span></div>', unsafe_allow_html=True)
-    else:
-        st.info(f"Sem dados de vendas registrados para o ano de {ano_selecionado}.")
+    with profiler.span("resumo_mensal"):
+        st.header(f"🗓️ Faturamento Mensal ({ano_selecionado})")
+        if ano_selecionado in rollup.yearly.index:
+            # Lista inteira em um único elemento, com a variação sobre o mesmo mês do ano anterior
+            totais = rollup.months_of_year(ano_selecionado)["Total"].to_numpy()
+            totais_anterior = rollup.months_of_year(ano_selecionado - 1)["Total"].to_numpy()
+            deltas = year_over_year(totais, totais_anterior) if ano_selecionado - 1 in rollup.yearly.index else None
+            st.markdown(
+                render_summary_list(meses_ordem, totais, deltas, empty_message="Nenhum dado para o ano."),
+                unsafe_allow_html=True
+            )
+            if deltas is not None:
+                st.caption(f"Variação em relação ao mesmo mês de {ano_selecionado - 1}.")
+        else:
+            st.info(f"Sem dados de vendas registrados para o ano de {ano_selecionado}.")
 
     # Tabela de Vendas Diárias do Mês Selecionado
-    st.header(f"📋 Vendas Diárias - {mes_selecionado_nome} / {ano_selecionado}")
-    if not df_filtered_month.empty:
-        df_daily_table = df_filtered_month[['Data', 'Total']].copy()
-        df_daily_table['Data'] = df_daily_table['Data'].dt.strftime('%d/%m/%Y')
-        df_daily_table['Total'] = df_daily_table['Total'].apply(format_brl)
-        df_daily_table = df_daily_table.rename(columns={'Data': 'Dia', 'Total': 'Venda Total'})
-        st.dataframe(df_daily_table, use_container_width=True, hide_index=True)
-    else:
-        st.info(f"Sem dados de vendas diárias para {mes_selecionado_nome} de {ano_selecionado}.")
+    with profiler.span("tabela_diaria"):
+        st.header(f"📋 Vendas Diárias - {mes_selecionado_nome} / {ano_selecionado}")
+        if not df_filtered_month.empty:
+            colunas_tabela = ['Data', 'Loja', 'Total'] if 'Loja' in df_filtered_month.columns else ['Data', 'Total']
+            df_daily_table = df_filtered_month[colunas_tabela].copy()
+            df_daily_table['Data'] = df_daily_table['Data'].dt.strftime('%d/%m/%Y')
+            df_daily_table['Total'] = format_brl_series(df_daily_table['Total']).to_numpy()
+            df_daily_table = df_daily_table.rename(columns={'Data': 'Dia', 'Total': 'Venda Total'})
+            st.dataframe(df_daily_table, use_container_width=True, hide_index=True)
+        else:
+            st.info(f"Sem dados de vendas diárias para {mes_selecionado_nome} de {ano_selecionado}.")
 
     # Gráficos do Mês Selecionado
     st.header(f"📈 Gráficos - {mes_selecionado_nome} / {ano_selecionado}")
-    if not df_filtered_month.empty:
+    if not df_month_daily.empty:
         # Verificar se há dados suficientes para gráficos
-        if len(df_filtered_month) > 0:
+        if len(df_month_daily) > 0:
+            # Specs reaproveitadas enquanto período e versão dos dados não mudarem
+            periodo = (int(ano_selecionado), mes_selecionado_num)
+            versao = data_version(df_all)
+            # Dataset compacto montado uma vez e usado pelos gráficos acumulado e diário
+            df_chart_month = month_chart_data(df_month_daily)
+
             # Heatmap estilo GitHub mensal
-            heatmap_chart = create_monthly_activity_heatmap(df_filtered_month, mes_selecionado_nome, ano_selecionado)
-            if heatmap_chart:
-                st.altair_chart(heatmap_chart, use_container_width=True)
-            
-            cumulative_chart = create_cumulative_chart_mobile(df_filtered_month)
-            if cumulative_chart:
-                st.altair_chart(cumulative_chart, use_container_width=True)
-            else:
-                st.info("Gráfico acumulado indisponível.")
+            render_cached_chart(
+                "heatmap_mensal", periodo, versao,
+                lambda: create_monthly_activity_heatmap(df_month_daily, mes_selecionado_nome, ano_selecionado),
+                profiler
+            )
 
-            daily_chart = create_daily_sales_chart_mobile(df_filtered_month)
-            if daily_chart:
-                st.altair_chart(daily_chart, use_container_width=True)
-            else:
+            # Mês em andamento: o acumulado ganha a projeção até o fim do mês
+            df_projecao = projection_chart_data(projecao_mes) if projecao_mes else None
+            if not render_cached_chart("acumulado", periodo, versao, lambda: create_cumulative_chart_mobile(df_chart_month, ano_selecionado, mes_selecionado_num, df_projecao), profiler):
+                st.info("Gráfico acumulado indisponível.")
+            elif projecao_mes:
+                faixa = ""
+                if projecao_mes["inferior"] is not None:
+                    faixa = f" (provável entre {format_brl(projecao_mes['inferior'])} e {format_brl(projecao_mes['superior'])})"
+                st.caption(f"📈 Projeção para o fim do mês: {format_brl(projecao_mes['previsto'])}{faixa}, "
+                           f"com base no perfil semanal e no ritmo recente de vendas.")
+
+            if not render_cached_chart("vendas_diarias", periodo, versao, lambda: create_daily_sales_chart_mobile(df_chart_month, ano_selecionado, mes_selecionado_num), profiler):
                 st.info("Gráfico de vendas diárias indisponível.")
         else:
             st.info("Dados insuficientes para gerar gráficos.")
     else:
         st.info(f"Sem dados de vendas registrados para {mes_selecionado_nome} de {ano_selecionado}.")
 
+    # Calendário anual (comparação de sazonalidade entre anos)
+    st.header("🔥 Calendário Anual de Vendas")
+    anos_heatmap = st.multiselect(
+        "Anos",
+        anos_disponiveis,
+        default=anos_disponiveis[:3]
+    )
+    if anos_heatmap:
+        if not render_cached_chart(
+            "heatmap_anual", tuple(sorted(int(a) for a in anos_heatmap)), data_version(df_all),
+            lambda: create_annual_activity_heatmap(rollup.daily, anos_heatmap),
+            profiler
+        ):
+            st.info("Calendário anual indisponível.")
+    else:
+        st.info("Selecione ao menos um ano para ver o calendário anual.")
+
 # --- Ponto de Entrada ---
 if __name__ == "__main__":
     main()
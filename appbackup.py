@@ -6,7 +6,17 @@ import numpy as np
 from datetime import datetime, timedelta
 from google.oauth2.service_account import Credentials
 from gspread.exceptions import SpreadsheetNotFound
+import os
+import time
 import warnings
+from snapshot_store import SnapshotStore
+from sales_pipeline import SalesRefresher, add_derived_columns, add_display_columns, data_version, dias_semana_ordem, meses_ordem, normalize_dates
+from sales_cache import SalesCache
+from data_store import SharedDataStore
+from write_queue import SalesWriteQueue
+from financial_engine import DRE_LINES, ENCARGOS_PESSOAL, break_even_supplier_pct, compute_dre, dre_by_month, dre_by_year, scenario_grid
+from rolling_analytics import RollingAnalytics
+from forecasting import SalesForecaster
 
 # Suprimir warnings específicos do pandas
 warnings.filterwarnings('ignore', category=FutureWarning, message='.*observed=False.*')
@@ -14,6 +24,8 @@ warnings.filterwarnings('ignore', category=FutureWarning, message='.*observed=Fa
 # --- Configurações Globais e Constantes ---
 SPREADSHEET_ID = '1NTScbiIna-iE7roQ9XBdjUOssRihTFFby4INAAQNXTg'
 WORKSHEET_NAME = 'Vendas'
+SNAPSHOT_DIR = '.cache'
+RELOAD_INTERVAL_SECONDS = 300  # Releitura periódica da planilha em segundo plano
 
 # Configuração da página Streamlit
 st.set_page_config(page_title="Sistema Financeiro - Clips Burger", layout="wide", page_icon="🍔")
@@ -24,10 +36,6 @@ alt.data_transformers.enable('json')
 # Paleta de cores otimizada para modo escuro
 CORES_MODO_ESCURO = ['#4c78a8', '#54a24b', '#f58518', '#e45756', '#72b7b2', '#ff9da6', '#9d755d', '#bab0ac']
 
-# Define a ordem correta dos dias da semana e meses
-dias_semana_ordem = ["Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira", "Sexta-feira", "Sábado", "Domingo"]
-meses_ordem = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
-
 # CSS para melhorar a aparência
 def inject_css():
     st.markdown("""
@@ -127,39 +135,37 @@ def get_worksheet():
             return None
     return None
 
-@st.cache_data
 def read_sales_data():
-    """Lê todos os registros da planilha de vendas e retorna como DataFrame."""
+    """Lê todos os registros da planilha de vendas e retorna como DataFrame (só nas cargas do SharedDataStore).
+
+    Falhas de acesso ou leitura levantam exceção, para quem recarrega não confundir uma
+    leitura que falhou com uma planilha vazia.
+    """
     worksheet = get_worksheet()
-    if worksheet:
-        try:
-            rows = worksheet.get_all_records()
-            if not rows:
-                st.info("A planilha de vendas está vazia.")
-                return pd.DataFrame()
+    if not worksheet:
+        raise RuntimeError("Planilha de vendas indisponível.")
+    rows = worksheet.get_all_records()
+    if not rows:
+        return pd.DataFrame()
 
-            df = pd.DataFrame(rows)
-            
-            for col in ['Cartão', 'Dinheiro', 'Pix']:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-                else:
-                    df[col] = 0
-            
-            if 'Data' not in df.columns:
-                df['Data'] = pd.NaT
+    df = pd.DataFrame(rows)
+    
+    for col in ['Cartão', 'Dinheiro', 'Pix']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        else:
+            df[col] = 0
+    
+    if 'Data' not in df.columns:
+        df['Data'] = pd.NaT
 
-            return df
-        except Exception as e:
-            st.error(f"Erro ao ler dados da planilha: {e}")
-            return pd.DataFrame()
-    return pd.DataFrame()
+    return df
 
 # --- Funções de Manipulação de Dados ---
-def add_data_to_sheet(date, cartao, dinheiro, pix, worksheet_obj):
-    """Adiciona uma nova linha de dados à planilha Google Sheets."""
-    if worksheet_obj is None:
-        st.error("Não foi possível acessar a planilha para adicionar dados.")
+def add_data_to_sheet(date, cartao, dinheiro, pix, write_queue):
+    """Registra uma nova venda na fila local; o envio à planilha Google Sheets é feito em segundo plano."""
+    if write_queue is None:
+        st.error("Não foi possível acessar a fila de registro de vendas.")
         return False
     try:
         cartao_val = float(cartao) if cartao else 0.0
@@ -167,20 +173,36 @@ def add_data_to_sheet(date, cartao, dinheiro, pix, worksheet_obj):
         pix_val = float(pix) if pix else 0.0
         
         new_row = [date, cartao_val, dinheiro_val, pix_val]
-        worksheet_obj.append_row(new_row)
+        write_queue.enqueue(new_row)
         st.success("Dados registrados com sucesso! ✅")
         return True
     except ValueError as ve:
         st.error(f"Erro ao converter valores para número: {ve}. Verifique os dados de entrada.")
         return False
     except Exception as e:
-        st.error(f"Erro ao adicionar dados na planilha: {e}")
+        st.error(f"Erro ao registrar a venda: {e}")
         return False
 
-@st.cache_data
+def append_rows_to_sheet(rows):
+    """Envia um lote de linhas à planilha (chamado pela fila de gravação)."""
+    worksheet = get_worksheet()
+    if worksheet is None:
+        raise RuntimeError("Planilha indisponível.")
+    worksheet.append_rows(rows)
+
+@st.cache_resource
+def get_write_queue():
+    """Fila de gravação de vendas com log em disco, compartilhada entre sessões."""
+    return SalesWriteQueue(os.path.join(SNAPSHOT_DIR, 'fila_vendas.jsonl'), flush=append_rows_to_sheet)
+
 def process_data(df_input):
-    """Processa e prepara os dados de vendas para análise."""
+    """Processa e prepara os dados de vendas para análise.
+
+    Retorna (df, avisos): roda também na thread de releitura, então os avisos são devolvidos
+    como texto e exibidos no caminho da requisição (ver load_sales_data).
+    """
     df = df_input.copy()
+    avisos = []
     
     cols_to_ensure_numeric = ['Cartão', 'Dinheiro', 'Pix', 'Total']
     cols_to_ensure_date_derived = ['Ano', 'Mês', 'MêsNome', 'AnoMês', 'DataFormatada', 'DiaSemana', 'DiaDoMes']
@@ -193,7 +215,7 @@ def process_data(df_input):
         for col in cols_to_ensure_date_derived:
             empty_df[col] = pd.Series(dtype='object' if col in ['MêsNome', 'AnoMês', 'DataFormatada', 'DiaSemana'] else 'float')
         empty_df['Data'] = pd.Series(dtype='datetime64[ns]')
-        return empty_df
+        return empty_df, avisos
 
     for col in ['Cartão', 'Dinheiro', 'Pix']:
         if col in df.columns:
@@ -205,49 +227,147 @@ def process_data(df_input):
 
     if 'Data' in df.columns and not df['Data'].isnull().all():
         try:
-            if pd.api.types.is_string_dtype(df['Data']):
-                df['Data'] = pd.to_datetime(df['Data'], dayfirst=True, errors='coerce')
-                if df['Data'].isnull().all():
-                    df['Data'] = pd.to_datetime(df_input['Data'], errors='coerce')
-            elif not pd.api.types.is_datetime64_any_dtype(df['Data']):
-                df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
-            
+            df['Data'], date_report = normalize_dates(df['Data'])
+            if date_report.invalid:
+                avisos.append(f"⚠️ {date_report.invalid} registro(s) com data em formato não reconhecido foram ignorados.")
             df.dropna(subset=['Data'], inplace=True)
 
             if not df.empty:
-                df['Ano'] = df['Data'].dt.year
-                df['Mês'] = df['Data'].dt.month
-
-                try:
-                    df['MêsNome'] = df['Data'].dt.strftime('%B').str.capitalize()
-                    if not df['MêsNome'].dtype == 'object' or df['MêsNome'].str.isnumeric().any():
-                         df['MêsNome'] = df['Mês'].map(lambda x: meses_ordem[int(x)-1] if pd.notna(x) and 1 <= int(x) <= 12 else "Inválido")
-                except Exception:
-                    df['MêsNome'] = df['Mês'].map(lambda x: meses_ordem[int(x)-1] if pd.notna(x) and 1 <= int(x) <= 12 else "Inválido")
-
-                df['AnoMês'] = df['Data'].dt.strftime('%Y-%m')
-                df['DataFormatada'] = df['Data'].dt.strftime('%d/%m/%Y')
-                
-                day_map = {0: "Segunda-feira", 1: "Terça-feira", 2: "Quarta-feira", 3: "Quinta-feira", 4: "Sexta-feira", 5: "Sábado", 6: "Domingo"}
-                df['DiaSemana'] = df['Data'].dt.dayofweek.map(day_map)
-                df['DiaDoMes'] = df['Data'].dt.day
-
-                df['DiaSemana'] = pd.Categorical(df['DiaSemana'], categories=[d for d in dias_semana_ordem if d in df['DiaSemana'].unique()], ordered=True)
+                add_derived_columns(df)
+                add_display_columns(df)
             else:
                 for col in cols_to_ensure_date_derived:
                     df[col] = pd.Series(dtype='object' if col in ['MêsNome', 'AnoMês', 'DataFormatada', 'DiaSemana'] else 'float')
         except Exception as e:
-            st.error(f"Erro crítico ao processar a coluna 'Data': {e}. Verifique o formato das datas na planilha.")
+            avisos.append(f"Erro crítico ao processar a coluna 'Data': {e}. Verifique o formato das datas na planilha.")
             for col in cols_to_ensure_date_derived:
                 df[col] = pd.Series(dtype='object' if col in ['MêsNome', 'AnoMês', 'DataFormatada', 'DiaSemana'] else 'float')
     else:
         if 'Data' not in df.columns:
-            st.warning("Coluna 'Data' não encontrada no DataFrame. Algumas análises temporais não estarão disponíveis.")
+            avisos.append("Coluna 'Data' não encontrada no DataFrame. Algumas análises temporais não estarão disponíveis.")
             df['Data'] = pd.NaT
         for col in cols_to_ensure_date_derived:
             df[col] = pd.Series(dtype='object' if col in ['MêsNome', 'AnoMês', 'DataFormatada', 'DiaSemana'] else 'float')
-            
-    return df
+
+    # Só roda nas cargas da planilha, então o snapshot acompanha cada recarga
+    if not df.empty:
+        get_snapshot_store().save(df)
+    data_version(df)
+    return df, avisos
+
+# --- Snapshot Local dos Dados Processados ---
+@st.cache_resource
+def get_snapshot_store():
+    """Snapshot em disco (Feather) dos dados processados."""
+    return SnapshotStore(os.path.join(SNAPSHOT_DIR, 'vendas_processadas.feather'))
+
+@st.cache_resource
+def get_data_store():
+    """Versões dos dados processados compartilhadas (sem cópia) por todas as sessões."""
+    return SharedDataStore()
+
+def reload_from_sheet(store):
+    """Lê e processa a planilha, publica a nova versão e descarta da fila as vendas que ela já contém.
+
+    Retorna None quando a leitura deu certo, ou a mensagem do problema. Uma leitura que
+    falhou ou voltou vazia não substitui a versão já publicada (ex.: o snapshot do disco),
+    e a fila só é aparada depois de uma leitura bem-sucedida.
+    """
+    loaded_at = time.time()
+    try:
+        df_raw = read_sales_data()
+        error = None if not df_raw.empty else "A planilha de vendas está vazia."
+    except Exception as e:
+        df_raw = pd.DataFrame()
+        error = f"Erro ao ler dados da planilha: {e}"
+
+    if error is not None and store.current() is not None:
+        return error
+    df_sheet, avisos = process_data(df_raw)
+    store.publish(df_sheet, as_of=datetime.now(), warnings=avisos)
+    if error is None:
+        # Vendas da fila enviadas antes desta leitura já vêm na planilha
+        get_write_queue().acknowledge_reload(loaded_at)
+    return error
+
+class SheetRefresher(SalesRefresher):
+    """Releitura periódica da planilha com reload_from_sheet: publica a nova versão e apara a fila.
+
+    Traz para o app as edições feitas direto na planilha e descarta da fila de gravação as
+    vendas já enviadas, que sem releitura ficariam sobrepostas para sempre.
+    """
+
+    def __init__(self, store, interval=RELOAD_INTERVAL_SECONDS):
+        super().__init__(None, None, interval)
+        self.store = store
+
+    def _reconcile_pending(self):
+        return False
+
+    def _refresh(self):
+        erro = reload_from_sheet(self.store)
+        if erro:
+            raise RuntimeError(erro)
+
+@st.cache_resource
+def get_sheet_refresher():
+    """Thread de releitura da planilha, iniciada uma vez por processo."""
+    refresher = SheetRefresher(get_data_store())
+    refresher.start()
+    return refresher
+
+@st.cache_resource
+def get_startup_snapshot():
+    """Publica o snapshot do disco uma vez por processo e dispara a releitura da planilha em segundo plano."""
+    df_snapshot, meta = get_snapshot_store().load()
+    if df_snapshot is not None:
+        store = get_data_store()
+        store.publish(df_snapshot, as_of=datetime.fromtimestamp(meta['saved_at']) if meta and meta.get('saved_at') else None)
+
+        # Confere o snapshot com a planilha já na primeira volta da releitura periódica
+        get_sheet_refresher().refresh_now()
+    return df_snapshot is not None
+
+@st.cache_resource
+def get_sales_cache():
+    """Cache versionado dos dados processados + vendas da fila, compartilhado entre sessões."""
+    return SalesCache()
+
+def load_sales_data():
+    """Retorna o DataFrame processado, servindo o snapshot local até a planilha ser relida.
+
+    Os dados ficam no SharedDataStore: todas as sessões leem a mesma versão, sem as cópias
+    por chamada do st.cache_data. Vendas da fila de gravação ainda não vistas em uma
+    leitura da planilha são mescladas pelo SalesCache: só as linhas novas são processadas
+    e só os agregados dos períodos tocados são recalculados. A planilha é relida em segundo
+    plano pelo SheetRefresher a cada RELOAD_INTERVAL_SECONDS, ou logo após um envio da fila.
+    """
+    store = get_data_store()
+    get_startup_snapshot()
+    if store.current() is None:
+        # Sem snapshot em disco: a primeira carga lê a planilha no caminho da requisição
+        erro = reload_from_sheet(store)
+        if erro:
+            st.warning(erro)
+    write_queue = get_write_queue()
+    refresher = get_sheet_refresher()
+    # Vendas enviadas depois da última releitura: antecipa a próxima para apará-las da fila
+    if write_queue.last_flush_at and (refresher.last_attempt or 0) < write_queue.last_flush_at:
+        refresher.refresh_now()
+    snapshot = store.current()
+    for aviso in snapshot.warnings if snapshot else ():
+        st.warning(aviso)
+    return get_sales_cache().view(store.view(), write_queue.overlay_entries())
+
+@st.cache_resource(max_entries=2)
+def get_rolling_analytics(version, _rollup):
+    """Janelas móveis e variações da série diária completa, calculadas uma vez por versão dos dados."""
+    return RollingAnalytics(_rollup.daily)
+
+@st.cache_resource(max_entries=2)
+def get_sales_forecast(version, _rollup):
+    """Projeção de vendas (perfil semanal × nível recente), ajustada uma vez por versão dos dados."""
+    return SalesForecaster(_rollup.daily["Total"])
 
 # --- Funções de Gráficos Interativos em Altair ---
 def create_radial_plot(df):
@@ -579,55 +699,39 @@ def analyze_sales_by_weekday(df):
 
 # --- Funções de Cálculos Financeiros ---
 def calculate_financial_results(df, salario_minimo, custo_contadora, custo_fornecedores_percentual):
-    """Calcula os resultados financeiros com base nos dados de vendas seguindo normas contábeis."""
-    results = {
-        'receita_bruta': 0, 'receita_tributavel': 0, 'receita_nao_tributavel': 0,
-        'impostos_sobre_vendas': 0, 'receita_liquida': 0, 'custo_produtos_vendidos': 0,
-        'lucro_bruto': 0, 'margem_bruta': 0, 'despesas_administrativas': 0,
-        'despesas_com_pessoal': 0, 'despesas_contabeis': custo_contadora,
-        'total_despesas_operacionais': 0, 'lucro_operacional': 0, 'margem_operacional': 0,
-        'lucro_antes_ir': 0, 'lucro_liquido': 0, 'margem_liquida': 0,
-        'diferenca_tributavel_nao_tributavel': 0
-    }
-    
+    """Calcula os resultados financeiros com base nos dados de vendas seguindo normas contábeis.
+
+    O período inteiro de `df` vira um único período do motor de DRE (financial_engine),
+    com um mês de despesas fixas.
+    """
+    results = dict.fromkeys(DRE_LINES, 0)
+    results['despesas_contabeis'] = custo_contadora
+
     if df.empty: 
         return results
-    
-    results['receita_bruta'] = df['Total'].sum()
-    results['receita_tributavel'] = df['Cartão'].sum() + df['Pix'].sum()
-    results['receita_nao_tributavel'] = df['Dinheiro'].sum()
-    results['impostos_sobre_vendas'] = results['receita_tributavel'] * 0.06
-    results['receita_liquida'] = results['receita_bruta'] - results['impostos_sobre_vendas']
-    results['custo_produtos_vendidos'] = results['receita_bruta'] * (custo_fornecedores_percentual / 100)
-    results['lucro_bruto'] = results['receita_liquida'] - results['custo_produtos_vendidos']
-    
-    if results['receita_liquida'] > 0:
-        results['margem_bruta'] = (results['lucro_bruto'] / results['receita_liquida']) * 100
-    
-    results['despesas_com_pessoal'] = salario_minimo * 1.55
-    results['despesas_contabeis'] = custo_contadora
-    results['despesas_administrativas'] = 0
-    results['total_despesas_operacionais'] = (
-        results['despesas_com_pessoal'] + 
-        results['despesas_contabeis'] + 
-        results['despesas_administrativas']
-    )
-    
-    results['lucro_operacional'] = results['lucro_bruto'] - results['total_despesas_operacionais']
-    if results['receita_liquida'] > 0:
-        results['margem_operacional'] = (results['lucro_operacional'] / results['receita_liquida']) * 100
-    
-    results['lucro_antes_ir'] = results['lucro_operacional']
-    results['lucro_liquido'] = results['lucro_antes_ir']
-    if results['receita_liquida'] > 0:
-        results['margem_liquida'] = (results['lucro_liquido'] / results['receita_liquida']) * 100
-    
-    results['diferenca_tributavel_nao_tributavel'] = results['receita_nao_tributavel']
-    
-    return results
 
-def create_dre_textual(resultados, df_filtered, selected_anos_filter):
-    """Cria uma apresentação textual do DRE no estilo tradicional contábil usando dados anuais."""
+    totals = df[['Cartão', 'Dinheiro', 'Pix', 'Total']].sum().to_frame().T
+    dre = compute_dre(totals, salario_minimo, custo_contadora, custo_fornecedores_percentual)
+    return {line: float(value) for line, value in dre.iloc[0].items()}
+
+# Linhas do DRE textual: (rótulo, chave do resultado, estilo); valores de deduções entre parênteses
+DRE_LAYOUT = [
+    ("RECEITA BRUTA", 'receita_bruta', 'total'),
+    ("(-) DEDUÇÕES", None, 'grupo'),
+    ("Simples Nacional", 'impostos_sobre_vendas', 'deducao'),
+    ("RECEITA LÍQUIDA", 'receita_liquida', 'total'),
+    ("(-) CUSTO DOS PRODUTOS VENDIDOS", 'custo_produtos_vendidos', 'deducao_total'),
+    ("LUCRO BRUTO", 'lucro_bruto', 'total'),
+    ("(-) DESPESAS OPERACIONAIS", None, 'grupo'),
+    ("Despesas com Pessoal", 'despesas_com_pessoal', 'deducao'),
+    ("Serviços Contábeis", 'despesas_contabeis', 'deducao'),
+    ("LUCRO OPERACIONAL", 'lucro_operacional', 'total'),
+    ("LUCRO ANTES DO IMPOSTO DE RENDA", 'lucro_antes_ir', 'total'),
+    ("(-) Provisão para Imposto de Renda", None, 'vazio'),
+]
+
+def render_dre_html(ano_dre, resultados):
+    """Markup do DRE textual (um único bloco HTML) com análise vertical sobre a receita bruta."""
     def format_val(value):
         return f"{value:,.0f}".replace(",", ".")
 
@@ -636,135 +740,163 @@ def create_dre_textual(resultados, df_filtered, selected_anos_filter):
             return 0
         return (value / base) * 100
 
+    receita_bruta = resultados['receita_bruta']
+    celula = 'padding: 6px 8px; border-bottom: 1px solid rgba(148, 163, 184, 0.2);'
+    linhas = []
+    for rotulo, chave, estilo in DRE_LAYOUT:
+        if chave is None:
+            valor, percentual = ("-" if estilo == 'vazio' else ""), ""
+        else:
+            valor = format_val(resultados[chave])
+            if estilo.startswith('deducao'):
+                valor = f"({valor})"
+            percentual = f"{calc_percent(resultados[chave], receita_bruta):.1f}%".replace(".", ",")
+        negrito = 'font-weight: bold;' if estilo != 'deducao' else ''
+        recuo = 'padding-left: 32px;' if estilo == 'deducao' else ''
+        linhas.append(
+            f'<tr><td style="{celula}{negrito}{recuo}">{rotulo}</td>'
+            f'<td style="{celula}{negrito}text-align: right;">{valor}</td>'
+            f'<td style="{celula}text-align: right; color: #94a3b8;">{percentual}</td></tr>'
+        )
+
+    # Ano parcial (em andamento ou de abertura): despesas fixas só dos meses em operação
+    meses = int(resultados.get('meses', 12))
+    periodo = f" ({meses} {'mês' if meses == 1 else 'meses'} de operação)" if meses < 12 else ""
+
+    lucro = resultados['lucro_liquido']
+    av_lucro = f"{calc_percent(lucro, receita_bruta):.1f}%".replace(".", ",")
+    return f"""
+    <div style="text-align: center; margin-bottom: 30px;">
+        <h3 style="margin: 0; font-weight: normal;">DEMONSTRAÇÃO DO RESULTADO DO EXERCÍCIO</h3>
+        <p style="margin: 5px 0; font-style: italic;">Clips Burger - Exercício {ano_dre}{periodo}</p>
+    </div>
+    <table style="width: 100%; border-collapse: collapse; font-size: 15px;">
+        <tr><th style="text-align: left;"></th><th style="text-align: right; font-size: 14px;">Em R$</th><th style="text-align: right; font-size: 14px;">AV %</th></tr>
+        {''.join(linhas)}
+        <tr><td style="padding: 14px 8px; font-size: 1.4rem; font-weight: bold; border-top: 2px solid #94a3b8;">RESULTADO LÍQUIDO DO EXERCÍCIO</td>
+            <td style="padding: 14px 8px; font-size: 1.4rem; font-weight: bold; text-align: right; border-top: 2px solid #94a3b8;">{format_val(lucro)}</td>
+            <td style="padding: 14px 8px; text-align: right; color: #94a3b8; border-top: 2px solid #94a3b8;">{av_lucro}</td></tr>
+    </table>
+    """
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_dre_anual(salario_minimo, custo_contadora, custo_fornecedores_percentual, version, _rollup):
+    """DRE de todos os anos, calculado uma vez por combinação de parâmetros e versão dos dados."""
+    return dre_by_year(_rollup, salario_minimo, custo_contadora, custo_fornecedores_percentual)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_dre_statement(ano_dre, salario_minimo, custo_contadora, custo_fornecedores_percentual, version, _rollup):
+    """Valores e markup do DRE do ano, memoizados por (ano, parâmetros, versão); None se o ano não tiver vendas."""
+    dre_anual = get_dre_anual(salario_minimo, custo_contadora, custo_fornecedores_percentual, version, _rollup)
+    if ano_dre not in dre_anual.index:
+        return None
+    resultados = dre_anual.loc[ano_dre].to_dict()
+    return resultados, render_dre_html(ano_dre, resultados)
+
+def create_dre_textual(resultados, selected_anos_filter, parametros, version, rollup):
+    """Cria uma apresentação textual do DRE no estilo tradicional contábil usando dados anuais.
+
+    O DRE do ano vem de build_dre_statement: trocar de aba e voltar com os mesmos filtros e
+    parâmetros não recalcula nem reformata o demonstrativo.
+    """
     # Determinar o ano para o DRE
     if selected_anos_filter and len(selected_anos_filter) == 1:
         ano_dre = selected_anos_filter[0]
     else:
         ano_dre = datetime.now().year
 
-    # Filtrar dados APENAS por ano (ignorar filtro de mês)
-    if not df_filtered.empty and 'Ano' in df_filtered.columns:
-        df_ano = df_filtered[df_filtered['Ano'] == ano_dre].copy()
-        
-        # Recalcular resultados com dados do ano completo
-        if not df_ano.empty:
-            resultados_ano = calculate_financial_results(
-                df_ano, 
-                st.session_state.get('salario_tab4', 1550.0), 
-                st.session_state.get('contadora_tab4', 316.0) * 12,
-                st.session_state.get('fornecedores_tab4', 30.0)
-            )
-        else:
-            resultados_ano = resultados
-    else:
-        resultados_ano = resultados
+    # Ano completo (ignora o filtro de mês); sem vendas no ano, usa o resultado do período filtrado
+    statement = build_dre_statement(ano_dre, *parametros, version, rollup)
+    markup = statement[1] if statement else render_dre_html(ano_dre, resultados)
+    st.markdown(markup, unsafe_allow_html=True)
 
-    # Cabeçalho centralizado
-    st.markdown(f"""
-    <div style="text-align: center; margin-bottom: 30px;">
-        <h3 style="margin: 0; font-weight: normal;">DEMONSTRAÇÃO DO RESULTADO DO EXERCÍCIO</h3>
-        <p style="margin: 5px 0; font-style: italic;">Clips Burger - Exercício {ano_dre}</p>
-    </div>
-    <div style="text-align: right; margin-bottom: 20px;">
-        <p style="margin: 0; font-size: 14px; font-weight: bold;">Em R$</p>
-    </div>
-    """, unsafe_allow_html=True)
-
-    # Criar 2 colunas - descrição e valor
-    col1, col2 = st.columns([6, 2])
-    
-    # RECEITA BRUTA
-    with col1:
-        st.markdown("**RECEITA BRUTA**")
-    with col2:
-        st.markdown(f"**{format_val(resultados_ano['receita_bruta'])}**")
-    
-    # DEDUÇÕES
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("**(-) DEDUÇÕES**")
-    with col2:
-        st.markdown("")
-    
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("&nbsp;&nbsp;&nbsp;&nbsp;Simples Nacional")
-    with col2:
-        st.markdown(f"({format_val(resultados_ano['impostos_sobre_vendas'])})")
-    
-    # RECEITA LÍQUIDA
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("**RECEITA LÍQUIDA**")
-    with col2:
-        st.markdown(f"**{format_val(resultados_ano['receita_liquida'])}**")
-    
-    # CUSTO DOS PRODUTOS VENDIDOS
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("**(-) CUSTO DOS PRODUTOS VENDIDOS**")
-    with col2:
-        st.markdown(f"**({format_val(resultados_ano['custo_produtos_vendidos'])})**")
-    
-    # LUCRO BRUTO
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("**LUCRO BRUTO**")
-    with col2:
-        st.markdown(f"**{format_val(resultados_ano['lucro_bruto'])}**")
-    
-    # DESPESAS OPERACIONAIS
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("**(-) DESPESAS OPERACIONAIS**")
-    with col2:
-        st.markdown("")
-    
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("&nbsp;&nbsp;&nbsp;&nbsp;Despesas com Pessoal")
-    with col2:
-        st.markdown(f"({format_val(resultados_ano['despesas_com_pessoal'] * 12)})")
-    
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("&nbsp;&nbsp;&nbsp;&nbsp;Serviços Contábeis")
-    with col2:
-        st.markdown(f"({format_val(resultados_ano['despesas_contabeis'] * 12)})")
-    
-    # LUCRO OPERACIONAL
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("**LUCRO OPERACIONAL**")
-    with col2:
-        st.markdown(f"**{format_val(resultados_ano['lucro_operacional'])}**")
-    
-    # RESULTADO ANTES DO IMPOSTO DE RENDA
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("**LUCRO ANTES DO IMPOSTO DE RENDA**")
-    with col2:
-        st.markdown(f"**{format_val(resultados_ano['lucro_antes_ir'])}**")
-    
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("**(-) Provisão para Imposto de Renda**")
-    with col2:
-        st.markdown("**-**")
-    
-    # Linha de separação
-    st.markdown("---")
-    
-    # RESULTADO LÍQUIDO - destacado
-    col1, col2 = st.columns([6, 2])
-    with col1:
-        st.markdown("## **RESULTADO LÍQUIDO DO EXERCÍCIO**")
-    with col2:
-        st.markdown(f"## **{format_val(resultados_ano['lucro_liquido'])}**")
-    
     # Nota explicativa
     st.info(f"📅 **Nota:** Este DRE apresenta os resultados consolidados do exercício {ano_dre}, independente do filtro de mês aplicado nas outras análises.")
 
+def create_dre_comparison_table(dre_anual, anos):
+    """Tabela de comparação do DRE entre anos (linhas do DRE × anos), formatada para exibição."""
+    linhas = {
+        'receita_bruta': 'Receita Bruta',
+        'impostos_sobre_vendas': '(-) Simples Nacional',
+        'receita_liquida': 'Receita Líquida',
+        'custo_produtos_vendidos': '(-) CPV',
+        'lucro_bruto': 'Lucro Bruto',
+        'total_despesas_operacionais': '(-) Despesas Operacionais',
+        'lucro_liquido': 'Resultado Líquido',
+        'margem_bruta': 'Margem Bruta (%)',
+        'margem_liquida': 'Margem Líquida (%)',
+    }
+    anos = [ano for ano in sorted(anos) if ano in dre_anual.index]
+    tabela = dre_anual.loc[anos, list(linhas)].T.rename(index=linhas)
+    meses = dre_anual['meses'] if 'meses' in dre_anual.columns else pd.Series(12, index=dre_anual.index)
+    tabela.columns = [str(ano) if meses[ano] >= 12 else f"{ano} ({int(meses[ano])} m)" for ano in anos]
+    valores = tabela.iloc[:-2].map(lambda v: f"{v:,.0f}".replace(",", "."))
+    margens = tabela.iloc[-2:].map(lambda v: f"{v:.1f}%".replace(".", ","))
+    return pd.concat([valores, margens]).rename_axis('Linha do DRE').reset_index()
+
+def create_monthly_dre_chart(dre_mensal):
+    """Tendência mensal do DRE: resultado líquido por mês (barras) e margem líquida (linha)."""
+    if dre_mensal.empty:
+        return None
+    df = dre_mensal[['receita_bruta', 'lucro_liquido', 'margem_liquida']].reset_index()
+    df['Mês'] = pd.to_datetime(dict(year=df['Ano'], month=df['Mês'], day=1))
+    df['Resultado'] = np.where(df['lucro_liquido'] >= 0, 'Lucro', 'Prejuízo')
+
+    base = alt.Chart(df).encode(x=alt.X('yearmonth(Mês):T', title=None, axis=alt.Axis(format='%b/%y', labelAngle=-45)))
+    barras = base.mark_bar(cornerRadiusTopLeft=4, cornerRadiusTopRight=4, opacity=0.85).encode(
+        y=alt.Y('lucro_liquido:Q', title='Resultado Líquido (R$)', axis=alt.Axis(format=',.0f')),
+        color=alt.Color('Resultado:N', scale=alt.Scale(domain=['Lucro', 'Prejuízo'], range=[CORES_MODO_ESCURO[1], CORES_MODO_ESCURO[3]]),
+                        legend=alt.Legend(orient='bottom', title=None)),
+        tooltip=[
+            alt.Tooltip('yearmonth(Mês):T', title='Mês', format='%m/%Y'),
+            alt.Tooltip('receita_bruta:Q', title='Receita Bruta (R$)', format=',.2f'),
+            alt.Tooltip('lucro_liquido:Q', title='Resultado Líquido (R$)', format=',.2f'),
+            alt.Tooltip('margem_liquida:Q', title='Margem Líquida (%)', format='.1f'),
+        ]
+    )
+    linha = base.mark_line(point=True, color=CORES_MODO_ESCURO[2], strokeWidth=2).encode(
+        y=alt.Y('margem_liquida:Q', title='Margem Líquida (%)')
+    )
+    return alt.layer(barras, linha).resolve_scale(y='independent').properties(
+        title=alt.TitleParams(text="Tendência Mensal do Resultado", fontSize=18, anchor='start'),
+        height=400
+    ).configure_view(stroke=None).configure(background='transparent')
+
+def create_sensitivity_heatmap(grid, metrica):
+    """Heatmap de sensibilidade (salário × % fornecedores) do lucro líquido ou da margem líquida."""
+    if grid.empty:
+        return None
+    df = grid[[metrica]].reset_index()
+    df['Salário'] = df['salario'].map(lambda v: f"R$ {v:,.0f}".replace(",", "."))
+    df['Fornecedores'] = df['fornecedores_pct'].map(lambda v: f"{v:g}%".replace(".", ","))
+    ordem_salarios = df.drop_duplicates('salario').sort_values('salario', ascending=False)['Salário'].tolist()
+    ordem_fornecedores = df.drop_duplicates('fornecedores_pct').sort_values('fornecedores_pct')['Fornecedores'].tolist()
+    if metrica == 'lucro_liquido':
+        titulo, formato = 'Lucro Líquido Mensal (R$)', ',.0f'
+        df['Rótulo'] = (df[metrica] / 1000).map(lambda v: f"{v:.1f}k".replace(".", ","))
+    else:
+        titulo, formato = 'Margem Líquida (%)', '.1f'
+        df['Rótulo'] = df[metrica].map(lambda v: f"{v:.0f}%")
+
+    base = alt.Chart(df).encode(
+        x=alt.X('Fornecedores:O', title='Custo dos Produtos (% da receita)', sort=ordem_fornecedores, axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('Salário:O', title='Salário Base', sort=ordem_salarios)
+    )
+    celulas = base.mark_rect(cornerRadius=3).encode(
+        color=alt.Color(f'{metrica}:Q', title=titulo, scale=alt.Scale(scheme='redyellowgreen', domainMid=0),
+                        legend=alt.Legend(orient='bottom', format=formato)),
+        tooltip=[
+            alt.Tooltip('Salário:N', title='Salário Base'),
+            alt.Tooltip('Fornecedores:N', title='Custo dos Produtos'),
+            alt.Tooltip(f'{metrica}:Q', title=titulo, format=formato)
+        ]
+    )
+    textos = base.mark_text(fontSize=11, fontWeight='bold', color='#1e293b').encode(text='Rótulo:N')
+    return alt.layer(celulas, textos).properties(
+        title=alt.TitleParams(text="Sensibilidade do Resultado", fontSize=18, anchor='start'),
+        height=60 * len(ordem_salarios)
+    ).configure_view(stroke=None).configure(background='transparent')
+
 def create_financial_dashboard_altair(resultados):
     """Dashboard financeiro com legenda corrigida."""
     financial_data = pd.DataFrame({
@@ -852,15 +984,23 @@ def create_financial_dashboard_altair(resultados):
     return chart
 
 # --- Dashboard Premium Functions ---
-def create_premium_kpi_cards(df):
-    """Cria cards KPI premium com emoticons DENTRO dos boxes."""
+def create_premium_kpi_cards(df, analytics):
+    """Cria cards KPI premium com emoticons DENTRO dos boxes.
+
+    As variações vêm das janelas móveis (RollingAnalytics) terminadas no último dia do
+    filtro, sobre a série completa: o período anterior pode estar fora do filtro.
+    """
     if df.empty:
         return
     
     total_vendas = df['Total'].sum()
     media_diaria = df['Total'].mean()
     melhor_dia = df.loc[df['Total'].idxmax(), 'DataFormatada'] if not df.empty else "N/A"
-    crescimento = ((df['Total'].tail(7).mean() - df['Total'].head(7).mean()) / df['Total'].head(7).mean() * 100) if len(df) >= 14 else 15.5
+    fim = df['Data'].max()
+    var_media_semana = analytics.mean_delta("semana", fim)
+    var_mes = analytics.delta("mes", fim)
+    var_trimestre = analytics.delta("trimestre", fim)
+    var_ano = analytics.delta("ano", fim)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -869,7 +1009,7 @@ def create_premium_kpi_cards(df):
             st.metric(
                 label="💰 Faturamento Total",
                 value=format_brl(total_vendas),
-                delta=f"+{crescimento:.1f}% vs período anterior"
+                delta=f"{format_variacao(var_mes)} em 28 dias vs 28 anteriores" if var_mes is not None else None
             )
     
     with col2:
@@ -877,7 +1017,7 @@ def create_premium_kpi_cards(df):
             st.metric(
                 label="📊 Média Diária",
                 value=format_brl(media_diaria),
-                delta="+8.2% vs período anterior"
+                delta=f"{format_variacao(var_media_semana)} na média da semana vs anterior" if var_media_semana is not None else None
             )
     
     with col3:
@@ -891,13 +1031,17 @@ def create_premium_kpi_cards(df):
     with col4:
         with st.container():
             st.metric(
-                label="📈 Tendência",
-                value=f"+{crescimento:.1f}%",
-                delta="Crescimento sustentado"
+                label="📈 Tendência (90 dias)",
+                value=format_variacao(var_trimestre),
+                delta=f"{format_variacao(var_ano)} vs mesmo período do ano anterior" if var_ano is not None else None
             )
 
-def create_premium_insights(df):
-    """Insights com bordas coloridas na lateral esquerda."""
+def create_premium_insights(df, analytics, projecao=None):
+    """Insights com bordas coloridas na lateral esquerda.
+
+    `projecao` (SalesForecaster.month_end do mês do último dia filtrado) define a meta
+    sugerida; sem projeção (mês já fechado) a meta volta a ser a média diária + 15%.
+    """
     if df.empty:
         return
     
@@ -906,11 +1050,10 @@ def create_premium_insights(df):
     dias_trabalhados = len(df)
     media_diaria = total_vendas / dias_trabalhados if dias_trabalhados > 0 else 0
     
-    # Análise de tendência
-    if len(df) >= 14:
-        primeira_semana = df.head(7)['Total'].mean()
-        ultima_semana = df.tail(7)['Total'].mean()
-        tendencia = ((ultima_semana - primeira_semana) / primeira_semana * 100) if primeira_semana > 0 else 0
+    # Análise de tendência: últimos 7 dias de calendário vs os 7 anteriores
+    var_semana = analytics.delta("semana", df['Data'].max())
+    if var_semana is not None:
+        tendencia = var_semana * 100
         tendencia_texto = "crescimento" if tendencia > 0 else "declínio"
         tendencia_cor = "#4caf50" if tendencia > 0 else "#f44336"
     else:
@@ -931,6 +1074,18 @@ def create_premium_insights(df):
         melhor_metodo = "N/A"
         percentual_melhor = 0
     
+    # Meta: topo da faixa provável da projeção do mês, ou média + 15% sem projeção
+    if projecao:
+        mes_nome = meses_ordem[projecao['ultimo_dia'].month - 1]
+        meta = projecao['superior'] if projecao['superior'] is not None else projecao['previsto']
+        texto_meta = f"""No ritmo atual, {mes_nome} deve fechar em <strong>{format_brl(projecao['previsto'])}</strong>. 
+                Uma meta de <strong>{format_brl(meta)}</strong> (topo da faixa provável) 
+                exige vender acima do ritmo recente até o fim do mês."""
+    else:
+        texto_meta = f"""Com base na média atual de <strong>{format_brl(media_diaria)}</strong> por dia, 
+                uma meta de <strong>{format_brl(media_diaria * 1.15)}</strong> 
+                representaria um crescimento de 15%."""
+    
     st.subheader("🧠 Insights Inteligentes Automáticos")
     
     col1, col2, col3 = st.columns(3)
@@ -994,9 +1149,7 @@ def create_premium_insights(df):
         ">
             <h4 style="color: #e91e63; margin: 0 0 1rem 0;">🎯 Meta Sugerida</h4>
             <p style="margin: 0; line-height: 1.6; color: white;">
-                Com base na média atual de <strong>{format_brl(media_diaria)}</strong> por dia, 
-                uma meta de <strong>{format_brl(media_diaria * 1.15)}</strong> 
-                representaria um crescimento de 15%.
+                {texto_meta}
             </p>
         </div>
         """, unsafe_allow_html=True)
@@ -1005,6 +1158,10 @@ def create_premium_insights(df):
 def format_brl(value):
     return f"R$ {value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
 
+def format_variacao(delta):
+    """Variação relativa (0.125 -> "+12,5%"); "—" quando não há histórico para comparar."""
+    return "—" if delta is None else f"{delta * 100:+.1f}%".replace(".", ",")
+
 # --- Interface Principal da Aplicação ---
 def main():
     # Título com logo ao lado
@@ -1021,8 +1178,7 @@ def main():
         st.title("🍔 SISTEMA FINANCEIRO - CLIPS BURGER")
         st.caption("Gestão inteligente de vendas com análise financeira em tempo real")
 
-    df_raw = read_sales_data()
-    df_processed = process_data(df_raw)
+    df_processed = load_sales_data()
 
     # Criar 5 tabs incluindo o Dashboard Premium
     tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -1088,17 +1244,18 @@ def main():
         if st.button("✅ Registrar Venda", type="primary", use_container_width=True):
             if total_venda_form > 0:
                 formatted_date = data_input.strftime('%d/%m/%Y')
-                worksheet_obj = get_worksheet()
-                if worksheet_obj and add_data_to_sheet(formatted_date, cartao_val, dinheiro_val, pix_val, worksheet_obj):
-                    read_sales_data.clear()
-                    process_data.clear()
-                    st.success("✅ Venda registrada e dados recarregados!")
+                # Grava na fila local e atualiza a tela sem baixar a planilha de novo
+                if add_data_to_sheet(formatted_date, cartao_val, dinheiro_val, pix_val, get_write_queue()):
                     st.rerun()
-                elif not worksheet_obj: 
-                    st.error("❌ Falha ao conectar à planilha. Venda não registrada.")
             else: 
                 st.warning("⚠️ O valor total da venda deve ser maior que zero.")
 
+        status_fila = get_write_queue().status()
+        if status_fila['pendentes']:
+            st.caption(f"⏳ {status_fila['pendentes']} venda(s) aguardando envio para a planilha.")
+        if status_fila['erro']:
+            st.warning(f"⚠️ Envio para a planilha falhou, nova tentativa em andamento: {status_fila['erro']}")
+
     # --- SIDEBAR COM FILTROS ---
     selected_anos_filter, selected_meses_filter = [], []
     
@@ -1129,8 +1286,8 @@ def main():
         else: 
             st.info("📊 Não há dados processados para aplicar filtros.")
 
-    # Aplicar filtros
-    df_filtered = df_processed.copy()
+    # Aplicar filtros (cópia rasa: os filtros geram frames novos e ninguém altera df_filtered no lugar)
+    df_filtered = df_processed.copy(deep=False)
     if not df_filtered.empty:
         if selected_anos_filter and 'Ano' in df_filtered.columns: 
             df_filtered = df_filtered[df_filtered['Ano'].isin(selected_anos_filter)]
@@ -1139,8 +1296,15 @@ def main():
 
     # Mostrar informações dos filtros aplicados na sidebar
     if not df_filtered.empty:
-        total_registros_filtrados = len(df_filtered)
-        total_faturamento_filtrado = df_filtered['Total'].sum()
+        # Totais dos filtros direto do cubo mensal (atualizado incrementalmente a cada venda)
+        resumo_mensal = get_sales_cache().rollup()[1].monthly
+        filtro_mensal = np.ones(len(resumo_mensal), dtype=bool)
+        if selected_anos_filter:
+            filtro_mensal &= resumo_mensal.index.get_level_values('Ano').isin(selected_anos_filter)
+        if selected_meses_filter:
+            filtro_mensal &= resumo_mensal.index.get_level_values('Mês').isin(selected_meses_filter)
+        total_registros_filtrados = int(resumo_mensal.loc[filtro_mensal, 'registros'].sum())
+        total_faturamento_filtrado = resumo_mensal.loc[filtro_mensal, 'Total'].sum()
         st.sidebar.markdown("---")
         st.sidebar.markdown("### 📈 Resumo dos Filtros Aplicados")
         st.sidebar.metric("Registros Filtrados", total_registros_filtrados)
@@ -1174,7 +1338,7 @@ def main():
             else:
                 st.info("Não foi possível gerar o gráfico de área.")
         else:
-             if df_processed.empty and df_raw.empty and get_worksheet() is None: 
+             if df_processed.empty and get_worksheet() is None: 
                  st.warning("Não foi possível carregar os dados. Verifique configurações e credenciais.")
              elif df_processed.empty: 
                  st.info("Não há dados processados para exibir. Verifique a planilha de origem.")
@@ -1408,7 +1572,7 @@ def main():
             else: 
                 st.info("Dados insuficientes para o Histograma de Vendas.")
         else:
-            if df_processed.empty and df_raw.empty and get_worksheet() is None: 
+            if df_processed.empty and get_worksheet() is None: 
                 st.warning("Não foi possível carregar os dados da planilha.")
             elif df_processed.empty: 
                 st.info("Não há dados processados para exibir estatísticas.")
@@ -1467,9 +1631,26 @@ def main():
                 df_filtered, salario_minimo_input, custo_contadora_input, custo_fornecedores_percentual
             )
 
+            # DRE de todos os anos e meses em um passe sobre o cubo de agregados
+            versao_dados, rollup = get_sales_cache().rollup()
+            parametros = (salario_minimo_input, custo_contadora_input, custo_fornecedores_percentual)
+            dre_anual = get_dre_anual(*parametros, versao_dados, rollup)
+            dre_mensal = dre_by_month(rollup, *parametros, anos=selected_anos_filter)
+
             # === DRE TEXTUAL ===
             with st.container(border=True):
-                create_dre_textual(resultados, df_processed, selected_anos_filter)
+                create_dre_textual(resultados, selected_anos_filter, parametros, versao_dados, rollup)
+
+            # === COMPARAÇÃO ENTRE ANOS ===
+            if selected_anos_filter and len(selected_anos_filter) > 1:
+                with st.container(border=True):
+                    st.subheader("📊 Comparação do DRE entre Anos")
+                    st.dataframe(create_dre_comparison_table(dre_anual, selected_anos_filter), use_container_width=True, hide_index=True)
+
+            # === TENDÊNCIA MENSAL ===
+            dre_chart = create_monthly_dre_chart(dre_mensal)
+            if dre_chart:
+                st.altair_chart(dre_chart, use_container_width=True)
 
             st.markdown("---")
 
@@ -1524,6 +1705,47 @@ def main():
 
             st.markdown("---")
 
+            # === SIMULADOR DE CENÁRIOS ===
+            with st.container(border=True):
+                st.subheader("🧪 Simulador de Cenários")
+                st.caption("Resultado de um mês médio do período filtrado para cada combinação de salário e custo dos produtos, calculado de uma vez.")
+
+                resumo_mensal = rollup.monthly
+                filtro_cenario = np.ones(len(resumo_mensal), dtype=bool)
+                if selected_anos_filter:
+                    filtro_cenario &= resumo_mensal.index.get_level_values('Ano').isin(selected_anos_filter)
+                if selected_meses_filter:
+                    filtro_cenario &= resumo_mensal.index.get_level_values('Mês').isin(selected_meses_filter)
+                mes_medio = resumo_mensal[filtro_cenario].mean()
+
+                col_sim1, col_sim2 = st.columns(2)
+                with col_sim1:
+                    faixa_fornecedores = st.slider("📦 Faixa de custo dos produtos (%)", 0.0, 80.0, (25.0, 45.0), step=2.5)
+                with col_sim2:
+                    metrica_cenario = st.radio(
+                        "Métrica", ['lucro_liquido', 'margem_liquida'], horizontal=True,
+                        format_func=lambda m: {'lucro_liquido': 'Lucro Líquido', 'margem_liquida': 'Margem Líquida'}[m]
+                    )
+
+                if mes_medio.isna().any() or mes_medio['Total'] <= 0:
+                    st.info("Sem vendas no período filtrado para simular cenários.")
+                else:
+                    salarios = sorted({round(salario_minimo_input * f, 2) for f in (0.75, 1.0, 1.25, 1.5, 2.0)})
+                    percentuais = np.arange(faixa_fornecedores[0], faixa_fornecedores[1] + 1e-9, 2.5)
+                    grid = scenario_grid(mes_medio, salarios, percentuais, custo_contadora_input)
+                    heatmap_cenarios = create_sensitivity_heatmap(grid, metrica_cenario)
+                    if heatmap_cenarios:
+                        st.altair_chart(heatmap_cenarios, use_container_width=True)
+
+                    equilibrio = break_even_supplier_pct(mes_medio, salarios, custo_contadora_input)
+                    st.dataframe(pd.DataFrame({
+                        'Salário Base': [format_brl(s) for s in salarios],
+                        'Despesa com Pessoal': [format_brl(s * ENCARGOS_PESSOAL) for s in salarios],
+                        'Custo Máx. dos Produtos (equilíbrio)': [f"{p:.1f}%".replace(".", ",") for p in equilibrio],
+                    }), use_container_width=True, hide_index=True)
+
+            st.markdown("---")
+
             # === RESUMO EXECUTIVO ===
             with st.container(border=True):
                 st.subheader("📋 Resumo Executivo")
@@ -1573,8 +1795,13 @@ def main():
         st.header("🚀 Dashboard Premium")
         
         if not df_filtered.empty:
+            versao_dados, rollup = get_sales_cache().rollup()
+            analytics = get_rolling_analytics(versao_dados, rollup)
+            fim_filtro = df_filtered['Data'].max()
+            projecao = get_sales_forecast(versao_dados, rollup).month_end(fim_filtro.year, fim_filtro.month)
+            
             # KPIs Premium usando st.columns (sem HTML complexo)
-            create_premium_kpi_cards(df_filtered)
+            create_premium_kpi_cards(df_filtered, analytics)
             
             st.markdown("---")
             
@@ -1603,7 +1830,7 @@ def main():
             st.markdown("---")
             
             # Insights Inteligentes usando st.columns (sem HTML complexo)
-            create_premium_insights(df_filtered)
+            create_premium_insights(df_filtered, analytics, projecao)
             
         else:
             st.warning("⚠️ Sem dados disponíveis. Ajuste os filtros na sidebar ou registre algumas vendas para visualizar o dashboard premium.")
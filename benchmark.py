@@ -0,0 +1,196 @@
+"""Benchmark do pipeline de dados e dos gráficos com históricos de vendas sintéticos.
+
+Roda offline (sem Google Sheets): gera planilhas sintéticas de 1, 5 e 20 anos, com dias
+densos (todo dia de funcionamento) ou esparsos, executa cada etapa isolada e grava
+tempos e pico de memória em JSON para comparar commits.
+
+    python benchmark.py
+    python benchmark.py --anos 1 5 --repeticoes 3 --saida resultados.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+import app
+import appbackup
+from chart_cache import chart_to_spec
+from chart_transport import month_chart_data
+from financial_engine import dre_by_month, dre_by_year
+from forecasting import SalesForecaster
+from rolling_analytics import RollingAnalytics
+from rollups import SalesRollup
+from sales_pipeline import SalesSheetSync, append_sales_rows
+from data_sources import SalesDataSource
+
+# Sem `streamlit run` cada chamada de st.* gera um aviso de "missing ScriptRunContext"
+for _name in list(logging.root.manager.loggerDict):
+    if _name.startswith("streamlit"):
+        logging.getLogger(_name).setLevel(logging.ERROR)
+
+HEADER = ["Data", "Cartão", "Dinheiro", "Pix"]
+DENSITIES = {"denso": 1.0, "esparso": 0.3}
+
+
+# --- Planilhas Sintéticas ---
+class MemorySource(SalesDataSource):
+    """Fonte em memória com as linhas já no formato de texto da planilha."""
+
+    kind = "memoria"
+
+    def __init__(self, values):
+        self.values = values
+
+    def read_all(self):
+        return self.values
+
+
+def synthetic_sheet(anos, densidade, seed=42):
+    """Linhas (cabeçalho incluído) de `anos` anos terminando hoje, sem domingos.
+
+    `densidade` é a fração dos dias de funcionamento com venda registrada.
+    """
+    rng = np.random.default_rng(seed)
+    fim = date.today()
+    inicio = fim - timedelta(days=365 * anos)
+    dias = pd.date_range(inicio, fim, freq="D")
+    dias = dias[dias.dayofweek != 6]
+    dias = dias[rng.random(len(dias)) < densidade]
+
+    # Sábado e sexta vendem mais; valores com centavos como na planilha
+    base = 900 + 500 * np.isin(dias.dayofweek, [4, 5])
+    total = base * rng.lognormal(0, 0.25, len(dias))
+    partes = rng.dirichlet([5, 1, 3], len(dias)) * total[:, None]
+    rows = [[d.strftime("%d/%m/%Y")] + [f"{v:.2f}" for v in p] for d, p in zip(dias, partes)]
+    return [HEADER] + rows
+
+
+# --- Medição ---
+def measure(fn, repeticoes):
+    """Executa `fn` `repeticoes` vezes; retorna tempos (ms) e o pico de memória (KB) de uma execução extra."""
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        fn()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "tempo_ms_min": round(min(tempos), 3),
+        "tempo_ms_mediana": round(statistics.median(tempos), 3),
+        "pico_memoria_kb": round(pico / 1024, 1),
+    }
+
+
+def stages(values):
+    """Etapas medidas para uma planilha: nome -> função sem argumentos."""
+    sync = SalesSheetSync()
+    df_all = sync.sync(MemorySource(values))
+    df_raw = pd.DataFrame(values[1:], columns=values[0])
+    df_processed, _ = appbackup.process_data(df_raw)
+    rollup = SalesRollup(df_all)
+
+    ultimo = df_all["Data"].iloc[-1]
+    ano, mes = int(ultimo.year), int(ultimo.month)
+    inicio_mes = ultimo.replace(day=1)
+    df_month_daily = rollup.days(inicio_mes, ultimo)
+    df_chart_month = month_chart_data(df_month_daily)
+    anos_recentes = sorted(rollup.yearly.index.astype(int))[-3:]
+    df_ano = df_processed[df_processed["Ano"] == ano]
+    nova_venda = [[ultimo.strftime("%d/%m/%Y"), 10.0, 5.0, 0.0]]
+
+    # Os construtores de gráficos são medidos até a spec Vega-Lite pronta
+    return {
+        "leitura_sync_completa": lambda: SalesSheetSync().sync(MemorySource(values)),
+        "process_data": lambda: appbackup.process_data(df_raw),
+        "append_sales_rows_1": lambda: append_sales_rows(df_processed, nova_venda),
+        "rollup_build": lambda: SalesRollup(df_all),
+        "rollup_apply_rows_1": lambda: rollup.apply_rows(df_all.iloc[-1:]),
+        "rollup_combine_3_lojas": lambda: SalesRollup.combine([rollup, rollup, rollup]),
+        "heatmap_mensal": lambda: chart_to_spec(app.create_monthly_activity_heatmap(df_month_daily, "Mês", ano)),
+        "heatmap_anual_3_anos": lambda: chart_to_spec(app.create_annual_activity_heatmap(rollup.daily, anos_recentes)),
+        "grafico_acumulado": lambda: chart_to_spec(app.create_cumulative_chart_mobile(df_chart_month, ano, mes)),
+        "grafico_vendas_diarias": lambda: chart_to_spec(app.create_daily_sales_chart_mobile(df_chart_month, ano, mes)),
+        "calculate_financial_results": lambda: appbackup.calculate_financial_results(df_ano, 1518.0, 316.0, 30.0),
+        "janelas_moveis_serie_completa": lambda: RollingAnalytics(rollup.daily),
+        "projecao_fim_do_mes": lambda: SalesForecaster(rollup.daily["Total"]).month_end(ano, mes),
+        "dre_todos_anos_e_meses": lambda: (dre_by_year(rollup, 1518.0, 316.0, 30.0), dre_by_month(rollup, 1518.0, 316.0, 30.0)),
+        "grafico_diario_backup": lambda: chart_to_spec(appbackup.create_advanced_daily_sales_chart(df_ano)),
+        "grafico_radial_backup": lambda: chart_to_spec(appbackup.create_radial_plot(df_ano)),
+        "grafico_dias_semana_backup": lambda: chart_to_spec(appbackup.create_enhanced_weekday_analysis(df_ano)[0]),
+        "histograma_backup": lambda: chart_to_spec(appbackup.create_sales_histogram(df_ano)),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(anos_list, densidades, repeticoes, etapas=None):
+    resultados = []
+    for anos in anos_list:
+        for densidade in densidades:
+            values = synthetic_sheet(anos, DENSITIES[densidade])
+            cenario = f"{anos}a_{densidade}"
+            for nome, fn in stages(values).items():
+                if etapas and nome not in etapas:
+                    continue
+                medida = measure(fn, repeticoes)
+                resultados.append({"cenario": cenario, "anos": anos, "densidade": densidade, "linhas": len(values) - 1, "etapa": nome, **medida})
+                print(f"{cenario:>12}  {nome:<28} {medida['tempo_ms_mediana']:>10.2f} ms  {medida['pico_memoria_kb']:>10.1f} KB")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de vendas e dos gráficos.")
+    parser.add_argument("--anos", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--densidades", nargs="+", choices=sorted(DENSITIES), default=["denso", "esparso"])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--etapas", nargs="+", help="Roda só as etapas informadas")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: benchmark_<commit>.json)")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    # process_data grava o snapshot Feather; no benchmark ele vai para um diretório temporário, removido ao fim
+    with tempfile.TemporaryDirectory(prefix="clips_bench_") as snapshot_dir:
+        appbackup.SNAPSHOT_DIR = snapshot_dir
+        resultados = run(args.anos, args.densidades, args.repeticoes, args.etapas)
+    saida = args.saida or f"benchmark_{commit or 'local'}.json"
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "repeticoes": args.repeticoes,
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {os.path.abspath(saida)}")
+
+
+if __name__ == "__main__":
+    main()
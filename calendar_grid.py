@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# --- Grade de Calendário (semanas × dias da semana) ---
+DIAS_CURTOS = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+
+
+def month_bounds(ano, mes):
+    """Primeiro e último dia do mês."""
+    inicio = np.datetime64(f"{int(ano):04d}-{int(mes):02d}", "M")
+    return inicio.astype("datetime64[D]"), (inicio + 1).astype("datetime64[D]") - 1
+
+
+def quarter_bounds(ano, trimestre):
+    """Primeiro e último dia do trimestre (1 a 4)."""
+    inicio, _ = month_bounds(ano, 3 * (int(trimestre) - 1) + 1)
+    _, fim = month_bounds(ano, 3 * int(trimestre))
+    return inicio, fim
+
+
+def year_bounds(ano):
+    """Primeiro e último dia do ano."""
+    return np.datetime64(f"{int(ano):04d}-01-01", "D"), np.datetime64(f"{int(ano):04d}-12-31", "D")
+
+
+def weekday(days):
+    """Dia da semana (0 = segunda) de datas datetime64[D], sem passar por objetos Python."""
+    # 1970-01-01 foi uma quinta-feira
+    return (days.astype("datetime64[D]").astype(np.int64) + 3) % 7
+
+
+def build_calendar_grid(dates, values, start, end):
+    """Grade de células diárias de start..end, alinhada a semanas de segunda a domingo.
+
+    `dates` são as datas das vendas e `values` um DataFrame (ou dict) de colunas numéricas
+    alinhadas a elas; valores do mesmo dia são somados. Retorna uma linha por célula com
+    Data, semana (0 = primeira coluna), dia_semana, dia_nome, no_periodo e as colunas de
+    valores (0 nos dias sem venda). Mês, trimestre e ano (53 semanas) usam o mesmo código.
+    """
+    start = np.datetime64(start, "D")
+    end = np.datetime64(end, "D")
+    grid_start = start - weekday(start)
+    grid_end = end + (6 - weekday(end))
+    n_cells = int((grid_end - grid_start).astype(np.int64)) + 1
+
+    cells = np.arange(n_cells)
+    cell_dates = grid_start + cells
+    grid = {
+        "Data": cell_dates,
+        "semana": cells // 7,
+        "dia_semana": cells % 7,
+        "dia_nome": pd.Categorical.from_codes(cells % 7, categories=DIAS_CURTOS, ordered=True),
+        "no_periodo": (cell_dates >= start) & (cell_dates <= end),
+    }
+
+    offsets = (np.asarray(dates, dtype="datetime64[D]") - grid_start).astype(np.int64)
+    inside = (offsets >= 0) & (offsets < n_cells)
+    for col, col_values in dict(values).items():
+        # Espalha os valores nas células pré-alocadas (soma quando há mais de uma linha no dia)
+        grid[col] = np.bincount(offsets[inside], weights=np.asarray(col_values, dtype=np.float64)[inside], minlength=n_cells)
+
+    frame = pd.DataFrame(grid)
+    frame["Data"] = frame["Data"].astype("datetime64[ns]")
+    return frame
+
+
+def activity_levels(values, n_levels=4):
+    """Classifica valores diários em níveis 0..n_levels (0 = sem venda) por quantis dos dias com venda.
+
+    Retorna os níveis (int8) e os limites usados entre níveis consecutivos, para que a cor
+    seja decidida no servidor e o gráfico receba só um inteiro pequeno por célula.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    positive = values[values > 0]
+    if positive.size == 0:
+        return np.zeros(values.shape, dtype=np.int8), np.array([])
+    thresholds = np.unique(np.quantile(positive, np.linspace(0, 1, n_levels + 1)[1:-1]))
+    levels = np.where(values > 0, np.searchsorted(thresholds, values, side="right") + 1, 0)
+    return levels.astype(np.int8), thresholds
@@ -0,0 +1,100 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import altair as alt
+import pandas as pd
+from chart_transport import arrow_bytes, payload_bytes
+
+_SUBCHARTS = ("layer", "hconcat", "vconcat", "concat")
+
+
+def _to_arrow_dataset(data, datasets):
+    """Grava o DataFrame em `datasets` como bytes Arrow e devolve o nome (hash do conteúdo)."""
+    payload = arrow_bytes(data)
+    name = "data-" + hashlib.md5(payload).hexdigest()
+    datasets[name] = payload
+    return name
+
+
+def _detach_data(chart, datasets, names):
+    """Cópia rasa do gráfico (e das camadas/subgráficos) com cada DataFrame trocado por um dataset nomeado.
+
+    O gráfico original não é alterado; `names` evita reconverter o mesmo DataFrame usado em várias camadas.
+    """
+    chart = chart.copy(deep=False)
+    data = chart._get("data")
+    if isinstance(data, pd.DataFrame):
+        if id(data) not in names:
+            names[id(data)] = _to_arrow_dataset(data, datasets)
+        chart.data = alt.NamedData(name=names[id(data)])
+    for attr in _SUBCHARTS:
+        subcharts = chart._get(attr)
+        if subcharts is not alt.Undefined:
+            chart[attr] = [_detach_data(sub, datasets, names) for sub in subcharts]
+    return chart
+
+
+def chart_to_spec(chart):
+    """Serializa o gráfico Altair em um dict Vega-Lite com os dados em `datasets` como bytes Arrow.
+
+    Os DataFrames são convertidos aqui, antes do `to_dict`, sem mexer no data transformer
+    global do Altair; por isso os encodings precisam declarar o tipo (ex.: "Total:Q").
+    O st.vega_lite_chart envia datasets em bytes direto como Arrow, sem passar por JSON;
+    camadas com o mesmo DataFrame compartilham um único dataset.
+    """
+    datasets = {}
+    spec = _detach_data(chart, datasets, {}).to_dict()
+    if datasets:
+        spec["datasets"] = {**spec.get("datasets", {}), **datasets}
+    return spec
+
+
+# --- Cache de Specs de Gráficos ---
+class ChartSpecCache:
+    """Cache LRU de specs Vega-Lite prontas, chaveado por (gráfico, período, versão dos dados).
+
+    Em um hit o gráfico não é reconstruído nem serializado de novo; `hits`/`misses` e o
+    tamanho de cada spec (`sizes`) alimentam o painel de diagnóstico.
+    """
+
+    def __init__(self, max_entries=48):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.sizes = {}
+        self._specs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        """Retorna a spec em cache ou chama `builder()` (que devolve um gráfico Altair ou None)."""
+        with self._lock:
+            spec = self._specs.get(key)
+            if spec is not None:
+                self._specs.move_to_end(key)
+                self.hits += 1
+                return spec
+            self.misses += 1
+
+        chart = builder()
+        if chart is None:
+            return None
+        spec = chart_to_spec(chart)
+        size = payload_bytes(spec)
+        with self._lock:
+            self._specs[key] = spec
+            self._specs.move_to_end(key)
+            self.sizes[key] = size
+            while len(self._specs) > self.max_entries:
+                old_key, _ = self._specs.popitem(last=False)
+                self.sizes.pop(old_key, None)
+        return spec
+
+    def stats(self):
+        """Contadores de uso do cache."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entradas": len(self._specs), "bytes": sum(self.sizes.values())}
+
+    def payload_size(self, key):
+        """Bytes da spec guardada para `key` (None se não estiver em cache)."""
+        with self._lock:
+            return self.sizes.get(key)
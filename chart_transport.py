@@ -0,0 +1,80 @@
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# --- Transporte Compacto de Dados dos Gráficos ---
+# Cada byte do dataset é baixado pelo celular. Aqui os dados são reduzidos às colunas que o
+# gráfico codifica, com números curtos e sem datas em texto (a data é remontada no navegador
+# a partir de inteiros), e vão como datasets nomeados em Arrow (colunar), não em JSON por linha.
+
+
+def compact_frame(df, fields, decimals=2):
+    """Projeta `fields` de `df` com números no menor formato JSON possível.
+
+    Floats são arredondados a `decimals` casas e viram inteiros quando não têm parte
+    fracionária; categorias viram texto. Colunas de data devem ser trocadas por inteiros
+    (dia, deslocamento) antes de chegar aqui.
+    """
+    out = {}
+    for col in fields:
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            raise TypeError(f"Coluna de data '{col}' deve ser enviada como inteiro.")
+        if pd.api.types.is_float_dtype(values):
+            values = values.round(decimals)
+            finite = values.dropna()
+            if len(finite) == len(values) and (finite == np.floor(finite)).all():
+                values = values.astype(np.int64)
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(str)
+        out[col] = values.to_numpy()
+    return pd.DataFrame(out)
+
+
+def month_chart_data(df_month_daily):
+    """Dataset do mês compartilhado pelos gráficos acumulado e diário: Dia e Total."""
+    return compact_frame(df_month_daily.sort_values("Data"), ["Dia", "Total"])
+
+
+def day_expression(ano, mes, field="Dia"):
+    """Expressão Vega que remonta a data local a partir do dia do mês (aceita dias fora do mês)."""
+    return f"datetime({int(ano)}, {int(mes) - 1}, datum.{field})"
+
+
+def arrow_bytes(df):
+    """DataFrame em bytes Arrow IPC (stream), o formato dos datasets nomeados do st.vega_lite_chart."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def payload_bytes(spec):
+    """Tamanho em bytes da spec como vai para o navegador: JSON da spec mais os datasets Arrow."""
+    datasets = spec.get("datasets", {})
+    arrow = {name: data for name, data in datasets.items() if isinstance(data, bytes)}
+    rest = {key: value for key, value in spec.items() if key != "datasets"}
+    if len(arrow) < len(datasets):
+        rest["datasets"] = {name: data for name, data in datasets.items() if name not in arrow}
+    size = len(json.dumps(rest, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    return size + sum(len(data) for data in arrow.values())
+
+
+def projection_chart_data(projecao):
+    """Acumulado projetado do mês (Dia, Previsto, Inferior, Superior) a partir de SalesForecaster.period_end.
+
+    Começa no último dia com dados, onde projeção e faixa coincidem com o realizado, para a
+    linha continuar a área do acumulado; dias sem faixa estimada ficam com o valor previsto.
+    """
+    diario = projecao["diario"]
+    realizado = projecao["realizado"]
+    previsto = realizado + diario["Acumulado"].to_numpy()
+    frame = pd.DataFrame({
+        "Dia": np.r_[projecao["ultimo_dia"].day, diario.index.day.to_numpy()],
+        "Previsto": np.r_[realizado, previsto],
+        "Inferior": np.r_[realizado, realizado + diario["Inferior"].fillna(diario["Acumulado"]).to_numpy()],
+        "Superior": np.r_[realizado, realizado + diario["Superior"].fillna(diario["Acumulado"]).to_numpy()],
+    })
+    return compact_frame(frame, ["Dia", "Previsto", "Inferior", "Superior"])
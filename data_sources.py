@@ -0,0 +1,317 @@
+import csv
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Fontes de Dados de Vendas ---
+# Todas as fontes expõem a planilha como lista de linhas de texto, com o cabeçalho na
+# primeira linha, para que SalesSheetSync e build_sales_frame funcionem sem mudanças.
+
+
+def _column_letter(n):
+    """Converte o número da coluna (1 = A) na letra usada em ranges A1."""
+    letters = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+class SalesDataSource:
+    """Interface comum das fontes de vendas (Google Sheets, CSV, SQLite)."""
+
+    kind = "base"
+    # Intervalo de releitura próprio da fonte em segundos (refresh_seconds da configuração); None = padrão do app
+    refresh_seconds = None
+
+    @property
+    def cache_key(self):
+        """Identificador estável da fonte, usado em nomes de snapshot."""
+        return self.kind
+
+    def read_all(self):
+        """Retorna todas as linhas, cabeçalho incluído."""
+        raise NotImplementedError
+
+    def read_from(self, first_row, width):
+        """Retorna as linhas de dados a partir do índice `first_row` (0 = primeira após o cabeçalho)."""
+        return self.read_all()[first_row + 1:]
+
+    def append_rows(self, rows):
+        """Acrescenta linhas de dados ao final da fonte."""
+        raise NotImplementedError
+
+
+class GoogleSheetsSource(SalesDataSource):
+    """Worksheet do Google Sheets acessada via gspread."""
+
+    kind = "sheets"
+
+    def __init__(self, gc, spreadsheet_id, worksheet_name):
+        self.gc = gc
+        self.spreadsheet_id = spreadsheet_id
+        self.worksheet_name = worksheet_name
+        self._worksheet = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_key(self):
+        return f"sheets_{self.spreadsheet_id[:12]}_{_slug(self.worksheet_name)}_{_digest(self.spreadsheet_id, self.worksheet_name)}"
+
+    @property
+    def worksheet(self):
+        with self._lock:
+            if self._worksheet is None:
+                spreadsheet = self.gc.open_by_key(self.spreadsheet_id)
+                self._worksheet = spreadsheet.worksheet(self.worksheet_name)
+            return self._worksheet
+
+    def read_all(self):
+        return self.worksheet.get_values()
+
+    def read_many(self, worksheet_names):
+        """Lê várias abas da mesma planilha em uma única chamada à API (values_batch_get)."""
+        ranges = ["'{}'".format(name.replace("'", "''")) for name in worksheet_names]
+        response = self.worksheet.spreadsheet.values_batch_get(ranges)
+        return [value_range.get("values", []) for value_range in response.get("valueRanges", [])]
+
+    def read_from(self, first_row, width):
+        # Linha 1 é o cabeçalho: a linha de dados i está na linha i + 2 da planilha
+        return self.worksheet.get_values(f"A{first_row + 2}:{_column_letter(width)}")
+
+    def append_rows(self, rows):
+        self.worksheet.append_rows(rows, value_input_option="USER_ENTERED")
+
+
+class CsvSource(SalesDataSource):
+    """Arquivo CSV local com o mesmo layout da planilha."""
+
+    kind = "csv"
+
+    def __init__(self, path, delimiter=","):
+        self.path = path
+        self.delimiter = delimiter
+
+    @property
+    def cache_key(self):
+        return f"csv_{_slug(self.path)}_{_digest(os.path.abspath(self.path))}"
+
+    def read_all(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return [row for row in csv.reader(f, delimiter=self.delimiter) if any(row)]
+
+    def append_rows(self, rows):
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f, delimiter=self.delimiter).writerows(rows)
+
+
+class SqliteSource(SalesDataSource):
+    """Tabela SQLite local; as colunas da tabela fazem o papel do cabeçalho da planilha."""
+
+    kind = "sqlite"
+
+    def __init__(self, path, table="vendas"):
+        if not re.fullmatch(r"\w+", table):
+            raise ValueError(f"Nome de tabela inválido: {table!r}")
+        self.path = path
+        self.table = table
+
+    @property
+    def cache_key(self):
+        return f"sqlite_{_slug(self.path)}_{self.table}_{_digest(os.path.abspath(self.path), self.table)}"
+
+    def _query(self, sql, params=()):
+        with sqlite3.connect(self.path) as conn:
+            cursor = conn.execute(sql, params)
+            header = [d[0] for d in cursor.description]
+            return header, cursor.fetchall()
+
+    def read_all(self):
+        if not os.path.exists(self.path):
+            return []
+        header, rows = self._query(f'SELECT * FROM "{self.table}" ORDER BY rowid')
+        return [header] + [["" if v is None else str(v) for v in row] for row in rows]
+
+    def read_from(self, first_row, width):
+        _, rows = self._query(f'SELECT * FROM "{self.table}" ORDER BY rowid LIMIT -1 OFFSET ?', (first_row,))
+        return [["" if v is None else str(v) for v in row] for row in rows]
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        placeholders = ", ".join("?" * len(rows[0]))
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany(f'INSERT INTO "{self.table}" VALUES ({placeholders})', rows)
+
+
+# --- Leitura Concorrente de Várias Fontes ---
+SourceTiming = namedtuple("SourceTiming", ["name", "kind", "seconds", "rows", "error"])
+SourceTiming.__doc__ = "Latência (s), linhas lidas e erro (ou None) de uma fonte em uma leitura concorrente."
+
+
+def _read_group(members):
+    """Lê um grupo de fontes; abas da mesma planilha Google saem em um único batch get."""
+    start = time.perf_counter()
+    try:
+        first = members[0][1]
+        if len(members) > 1:
+            results = first.read_many([source.worksheet_name for _, source in members])
+        else:
+            results = [first.read_all()]
+        return results, time.perf_counter() - start, None
+    except Exception as e:
+        return None, time.perf_counter() - start, str(e)
+
+
+def fetch_concurrently(sources, max_workers=8):
+    """Lê todas as fontes de `sources` ({nome: SalesDataSource}) em paralelo.
+
+    Abas da mesma planilha Google são agrupadas em uma chamada; os demais grupos rodam em
+    um pool de threads, então o tempo total é o da fonte mais lenta e não a soma. Retorna
+    ({nome: linhas}, [SourceTiming]); fontes com erro ficam fora do dict.
+    """
+    groups = {}
+    for name, source in sources.items():
+        if isinstance(source, GoogleSheetsSource):
+            key = ("sheets", id(source.gc), source.spreadsheet_id)
+        else:
+            key = ("fonte", name)
+        groups.setdefault(key, []).append((name, source))
+
+    values, timings = {}, []
+    if not groups:
+        return values, timings
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(groups)), thread_name_prefix="leitura") as pool:
+        futures = [(members, pool.submit(_read_group, members)) for members in groups.values()]
+        for members, future in futures:
+            results, seconds, error = future.result()
+            for i, (name, source) in enumerate(members):
+                rows = results[i] if results is not None else None
+                if rows is not None:
+                    values[name] = rows
+                timings.append(SourceTiming(name, source.kind, round(seconds, 4), max(len(rows) - 1, 0) if rows else 0, error))
+    return values, timings
+
+
+def align_rows(values, header):
+    """Linhas de dados de `values` (cabeçalho na primeira linha) reordenadas para as colunas de `header`."""
+    if not values:
+        return []
+    positions = {str(name): i for i, name in enumerate(values[0])}
+    index = [positions.get(name) for name in header]
+    return [[row[i] if i is not None and i < len(row) else "" for i in index] for row in values[1:]]
+
+
+class CombinedSource(SalesDataSource):
+    """Aba atual mais arquivos de anos anteriores (outras abas ou planilhas) como uma fonte só.
+
+    Na primeira leitura a aba atual e os arquivos são baixados em paralelo; os arquivos
+    ficam em memória e as leituras seguintes só consultam a aba atual. As linhas dos
+    arquivos vêm antes, então os índices usados pela sincronização incremental não mudam.
+    """
+
+    kind = "multi"
+
+    def __init__(self, live, archives, max_workers=8):
+        self.live = live
+        self.archives = list(archives)
+        self.max_workers = max_workers
+        self.timings = []
+        self._archived_rows = None
+        self._header = None
+        self._live_header = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_key(self):
+        digest = hashlib.md5("|".join(a.cache_key for a in self.archives).encode()).hexdigest()[:8]
+        return f"{self.live.cache_key}_arq{digest}"
+
+    def read_all(self):
+        with self._lock:
+            if self._archived_rows is not None:
+                live_values = self.live.read_all()
+                if live_values:
+                    self._live_header = [str(h) for h in live_values[0]]
+                return [self._header] + self._archived_rows + align_rows(live_values, self._header)
+
+            sources = {"atual": self.live}
+            sources.update({f"arquivo_{i + 1}": archive for i, archive in enumerate(self.archives)})
+            values, self.timings = fetch_concurrently(sources, self.max_workers)
+            failed = [t for t in self.timings if t.error]
+            if failed:
+                # Um arquivo faltando mudaria os índices de linha e os totais; melhor falhar inteiro
+                raise RuntimeError("; ".join(f"{t.name}: {t.error}" for t in failed))
+
+            header = next((values[name][0] for name in sources if values.get(name)), None)
+            if header is None:
+                return []
+            self._header = [str(h) for h in header]
+            if values.get("atual"):
+                self._live_header = [str(h) for h in values["atual"][0]]
+            self._archived_rows = [
+                row for name in sources if name != "atual" for row in align_rows(values[name], self._header)
+            ]
+            return [self._header] + self._archived_rows + align_rows(values["atual"], self._header)
+
+    def read_from(self, first_row, width):
+        if self._archived_rows is None or self._live_header is None or first_row < len(self._archived_rows):
+            return self.read_all()[first_row + 1:]
+        # Só a aba atual é consultada, e apenas a partir da linha pedida
+        rows = self.live.read_from(first_row - len(self._archived_rows), len(self._live_header))
+        return align_rows([self._live_header] + rows, self._header)
+
+    def append_rows(self, rows):
+        self.live.append_rows(rows)
+
+
+def _slug(path):
+    return re.sub(r"\W+", "_", os.path.splitext(os.path.basename(path))[0])
+
+
+def _digest(*parts):
+    """Hash curto das partes que identificam a fonte: o slug legível sozinho pode se repetir
+    (mesmo nome de arquivo em pastas diferentes, ids de planilha com o mesmo início)."""
+    return hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()[:10]
+
+
+def make_data_source(config, gc=None):
+    """Cria a fonte de dados a partir da configuração (`type`: sheets, csv ou sqlite).
+
+    Com `archives` (lista de configurações parciais, ex.: [{worksheet = "Vendas 2023"}]) os
+    arquivos de anos anteriores são somados à fonte principal via CombinedSource.
+    `refresh_seconds` vira o atributo de mesmo nome da fonte.
+    """
+    source = _build_source(config, gc)
+    if source is not None and config.get("refresh_seconds") is not None:
+        source.refresh_seconds = float(config["refresh_seconds"])
+    return source
+
+
+def _build_source(config, gc):
+    archives = config.get("archives")
+    if archives:
+        base = {k: v for k, v in config.items() if k != "archives"}
+        sources = [make_data_source({**base, **dict(archive)}, gc) for archive in archives]
+        live = make_data_source(base, gc)
+        if live is None or any(source is None for source in sources):
+            return None
+        return CombinedSource(live, sources)
+
+    kind = config.get("type", "sheets")
+    if kind == "sheets":
+        if gc is None:
+            return None
+        return GoogleSheetsSource(gc, config["spreadsheet_id"], config["worksheet"])
+    if kind == "csv":
+        return CsvSource(config["path"], config.get("delimiter", ","))
+    if kind == "sqlite":
+        return SqliteSource(config["path"], config.get("table", "vendas"))
+    raise ValueError(f"Tipo de fonte de dados desconhecido: {kind!r}")
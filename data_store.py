@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from sales_pipeline import data_version
+
+logger = logging.getLogger(__name__)
+
+DataSnapshot = namedtuple("DataSnapshot", ["frame", "version", "as_of", "nbytes", "published_at", "warnings"], defaults=((),))
+DataSnapshot.__doc__ = (
+    "Versão publicada dos dados: DataFrame compartilhado, versão, data de referência, memória ocupada "
+    "e avisos do processamento (exibidos pelas sessões, não pela thread que publicou)."
+)
+
+
+# --- Armazenamento Compartilhado entre Sessões ---
+class SharedDataStore:
+    """Versões imutáveis do DataFrame de vendas, compartilhadas por todas as sessões do processo.
+
+    Diferente de `st.cache_data`, que entrega uma cópia (pickle) a cada chamada, aqui todas
+    as sessões leem o mesmo DataFrame. `view()` devolve uma cópia rasa: com o Copy-on-Write
+    do pandas ela não duplica dados, e qualquer alteração feita por uma sessão fica só na
+    visão dela. São mantidas as `keep_versions` versões mais recentes (uma sessão pode
+    estar no meio de um rerun com a anterior), com a memória de cada uma contabilizada.
+    """
+
+    def __init__(self, keep_versions=2):
+        self.keep_versions = keep_versions
+        self._versions = OrderedDict()
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def publish(self, frame, as_of=None, warnings=None):
+        """Publica `frame` como versão atual (sem efeito se for o mesmo objeto ou a mesma versão).
+
+        `warnings` (mensagens do processamento) acompanha a versão; None mantém os da versão já publicada.
+        """
+        with self._lock:
+            current = next(reversed(self._versions.values()), None)
+            if current is not None and current.frame is frame:
+                return current
+        version = data_version(frame)
+        with self._lock:
+            snapshot = self._versions.get(version)
+            if snapshot is None:
+                nbytes = int(frame.memory_usage(index=True, deep=True).sum())
+                snapshot = DataSnapshot(frame, version, as_of, nbytes, time.time(), tuple(warnings or ()))
+                self._views.setdefault(version, 0)
+                logger.info("Versão %s publicada (%d linhas, %.1f MB).", version, len(frame), nbytes / 1e6)
+            else:
+                if as_of is not None and as_of != snapshot.as_of:
+                    snapshot = snapshot._replace(as_of=as_of)
+                if warnings is not None:
+                    snapshot = snapshot._replace(warnings=tuple(warnings))
+            self._versions[version] = snapshot
+            self._versions.move_to_end(version)
+            while len(self._versions) > self.keep_versions:
+                old_version, _ = self._versions.popitem(last=False)
+                self._views.pop(old_version, None)
+            return snapshot
+
+    def current(self):
+        """Versão mais recente publicada, ou None."""
+        with self._lock:
+            return next(reversed(self._versions.values()), None)
+
+    def view(self, snapshot=None):
+        """Visão somente leitura (cópia rasa, sem copiar dados) da versão atual ou da informada."""
+        snapshot = snapshot or self.current()
+        if snapshot is None:
+            return None
+        with self._lock:
+            if snapshot.version in self._views:
+                self._views[snapshot.version] += 1
+        frame = snapshot.frame.copy(deep=False)
+        frame.attrs["data_version"] = snapshot.version
+        return frame
+
+    def memory_report(self):
+        """Uma linha por versão mantida: versão, linhas, bytes, data de referência e visões entregues."""
+        with self._lock:
+            return [
+                {"versao": s.version, "linhas": len(s.frame), "bytes": s.nbytes, "dados_de": s.as_of, "visoes": self._views.get(s.version, 0)}
+                for s in self._versions.values()
+            ]
@@ -0,0 +1,103 @@
+import time
+from collections import namedtuple
+import pandas as pd
+from data_sources import fetch_concurrently, make_data_source
+from sales_pipeline import normalize_dates
+
+# --- Conjuntos de Dados Complementares ---
+# Custos, compras e outras abas com layout próprio. Cada conjunto declara o tipo das
+# colunas; conjuntos com o mesmo `schema` (ex.: custos de várias planilhas) são empilhados
+# em um único DataFrame tipado, com a coluna "Origem" indicando de onde veio cada linha.
+
+SCHEMAS = {
+    "custos": {"Data": "data", "Categoria": "categoria", "Descrição": "texto", "Valor": "numero"},
+    "compras": {"Data": "data", "Fornecedor": "categoria", "Descrição": "texto", "Valor": "numero"},
+}
+
+DatasetBundle = namedtuple("DatasetBundle", ["frames", "timings", "seconds"])
+DatasetBundle.__doc__ = "DataFrames tipados por schema, latência de cada fonte e tempo total da carga."
+
+
+def build_typed_frame(header, rows, column_types):
+    """Converte linhas de texto em DataFrame com os tipos de `column_types` (data, numero, categoria, texto).
+
+    Colunas não declaradas ficam como texto; linhas sem data válida são descartadas.
+    """
+    width = len(header)
+    rows = [list(row[:width]) + [""] * (width - len(row)) for row in rows]
+    df = pd.DataFrame(rows, columns=[str(h) for h in header])
+    for col, kind in column_types.items():
+        if col not in df.columns:
+            df[col] = pd.NA
+        if kind == "data":
+            df[col], _ = normalize_dates(df[col])
+        elif kind == "numero":
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(float)
+        elif kind == "categoria":
+            df[col] = df[col].astype("string").str.strip().astype("category")
+        else:
+            df[col] = df[col].astype("string")
+
+    date_cols = [col for col, kind in column_types.items() if kind == "data"]
+    if date_cols:
+        df = df.dropna(subset=date_cols).sort_values(date_cols[0], kind="stable")
+    return df.reset_index(drop=True)
+
+
+def load_datasets(configs, gc=None, max_workers=8):
+    """Carrega em paralelo os conjuntos de `configs` e empilha os de mesmo schema.
+
+    Cada configuração tem `name`, `schema` (padrão: o próprio nome), `columns` opcional
+    (sobrepõe os tipos do schema) e os campos de fonte de make_data_source.
+    """
+    start = time.perf_counter()
+    sources, types = {}, {}
+    for config in configs:
+        config = dict(config)
+        name = config["name"]
+        schema = config.get("schema", name)
+        source = make_data_source(config, gc)
+        if source is None:
+            continue
+        sources[name] = source
+        types[name] = (schema, {**SCHEMAS.get(schema, {}), **dict(config.get("columns", {}))})
+
+    values, timings = fetch_concurrently(sources, max_workers)
+
+    parts = {}
+    for name, rows in values.items():
+        if not rows:
+            continue
+        schema, column_types = types[name]
+        frame = build_typed_frame(rows[0], rows[1:], column_types)
+        frame["Origem"] = name
+        names, frame_list = parts.setdefault(schema, ([], []))
+        names.append(name)
+        frame_list.append(frame)
+
+    frames = {}
+    for schema, (names, frame_list) in parts.items():
+        # Categorias de origens diferentes viram a união (concat cairia para object)
+        combined = pd.concat(frame_list, ignore_index=True)
+        column_types = types[names[0]][1]
+        for col, kind in column_types.items():
+            if kind == "categoria":
+                combined[col] = combined[col].astype("category")
+        date_cols = [col for col, kind in column_types.items() if kind == "data"]
+        if date_cols and len(frame_list) > 1:
+            combined = combined.sort_values(date_cols[0], kind="stable", ignore_index=True)
+        combined["Origem"] = pd.Categorical(combined["Origem"], categories=names)
+        frames[schema] = combined
+    return DatasetBundle(frames, timings, round(time.perf_counter() - start, 4))
+
+
+def month_totals(frames, ano, mes):
+    """Soma de Valor de cada conjunto (por schema) no mês; conjuntos sem Data ou Valor ficam de fora."""
+    totals = {}
+    for schema, frame in frames.items():
+        if "Data" not in frame.columns or "Valor" not in frame.columns:
+            continue
+        datas = frame["Data"]
+        no_mes = (datas.dt.year == int(ano)) & (datas.dt.month == int(mes))
+        totals[schema] = float(frame.loc[no_mes, "Valor"].sum())
+    return totals
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# --- Parâmetros Contábeis ---
+ALIQUOTA_SIMPLES = 0.06  # Simples Nacional sobre a receita tributável (Cartão + Pix)
+ENCARGOS_PESSOAL = 1.55  # Salário base + 55% de encargos
+
+# Linhas do DRE na ordem do demonstrativo (mesmas chaves de calculate_financial_results)
+DRE_LINES = [
+    "receita_bruta", "receita_tributavel", "receita_nao_tributavel",
+    "impostos_sobre_vendas", "receita_liquida", "custo_produtos_vendidos",
+    "lucro_bruto", "margem_bruta", "despesas_administrativas",
+    "despesas_com_pessoal", "despesas_contabeis",
+    "total_despesas_operacionais", "lucro_operacional", "margem_operacional",
+    "lucro_antes_ir", "lucro_liquido", "margem_liquida",
+    "diferenca_tributavel_nao_tributavel",
+]
+
+
+# --- DRE Vetorizado ---
+def compute_dre(periods, salario_minimo, custo_contadora, custo_fornecedores_percentual, meses=1):
+    """DRE de todos os períodos de uma vez: uma linha por período, uma coluna por item do DRE.
+
+    `periods` tem Cartão, Dinheiro, Pix e Total somados por período (ex.: níveis mensal ou
+    anual do SalesRollup). Salário e contadora são valores mensais, multiplicados por `meses`
+    (escalar ou array com os meses de cada período) para compor as despesas fixas do período.
+    """
+    cartao = periods["Cartão"].to_numpy(dtype=np.float64)
+    dinheiro = periods["Dinheiro"].to_numpy(dtype=np.float64)
+    pix = periods["Pix"].to_numpy(dtype=np.float64)
+    receita_bruta = periods["Total"].to_numpy(dtype=np.float64)
+    meses = np.broadcast_to(np.asarray(meses, dtype=np.float64), receita_bruta.shape)
+
+    receita_tributavel = cartao + pix
+    impostos = receita_tributavel * ALIQUOTA_SIMPLES
+    receita_liquida = receita_bruta - impostos
+    cpv = receita_bruta * (custo_fornecedores_percentual / 100)
+    lucro_bruto = receita_liquida - cpv
+
+    pessoal = salario_minimo * ENCARGOS_PESSOAL * meses
+    contabeis = custo_contadora * meses
+    administrativas = np.zeros_like(receita_bruta)
+    total_despesas = pessoal + contabeis + administrativas
+    lucro_operacional = lucro_bruto - total_despesas
+
+    def margem(valor):
+        out = np.zeros_like(receita_bruta)
+        np.divide(valor * 100, receita_liquida, out=out, where=receita_liquida > 0)
+        return out
+
+    return pd.DataFrame({
+        "receita_bruta": receita_bruta,
+        "receita_tributavel": receita_tributavel,
+        "receita_nao_tributavel": dinheiro,
+        "impostos_sobre_vendas": impostos,
+        "receita_liquida": receita_liquida,
+        "custo_produtos_vendidos": cpv,
+        "lucro_bruto": lucro_bruto,
+        "margem_bruta": margem(lucro_bruto),
+        "despesas_administrativas": administrativas,
+        "despesas_com_pessoal": pessoal,
+        "despesas_contabeis": contabeis,
+        "total_despesas_operacionais": total_despesas,
+        "lucro_operacional": lucro_operacional,
+        "margem_operacional": margem(lucro_operacional),
+        "lucro_antes_ir": lucro_operacional,
+        "lucro_liquido": lucro_operacional,
+        "margem_liquida": margem(lucro_operacional),
+        "diferenca_tributavel_nao_tributavel": dinheiro,
+    }, index=periods.index)[DRE_LINES]
+
+
+def months_in_operation(rollup):
+    """Meses de despesas fixas de cada ano do cubo (Series indexada por Ano).
+
+    Anos intermediários contam 12; o primeiro começa no mês da primeira venda e o último
+    termina no mês da última venda, para um ano em andamento ou a abertura da loja não
+    receberem 12 meses de folha e contadora contra menos meses de receita.
+    """
+    meses = pd.Series(12, index=rollup.yearly.index, name="meses")
+    if meses.empty:
+        return meses
+    (primeiro_ano, primeiro_mes), (ultimo_ano, ultimo_mes) = min(rollup.monthly.index), max(rollup.monthly.index)
+    meses[primeiro_ano] -= int(primeiro_mes) - 1
+    meses[ultimo_ano] -= 12 - int(ultimo_mes)
+    return meses
+
+
+def dre_by_year(rollup, salario_minimo, custo_contadora, custo_fornecedores_percentual):
+    """DRE anual (exercício) de todos os anos do cubo, com a coluna `meses` de months_in_operation.
+
+    As despesas fixas de cada ano contam só os meses em operação (ano corrente até o mês da
+    última venda, primeiro ano desde a primeira venda).
+    """
+    meses = months_in_operation(rollup)
+    dre = compute_dre(rollup.yearly, salario_minimo, custo_contadora, custo_fornecedores_percentual, meses=meses.to_numpy())
+    dre["meses"] = meses.to_numpy()
+    return dre
+
+
+def dre_by_month(rollup, salario_minimo, custo_contadora, custo_fornecedores_percentual, anos=None):
+    """DRE mensal (índice Ano, Mês) dos anos informados, ou de todos; despesas fixas de um mês cada."""
+    monthly = rollup.monthly
+    if anos:
+        monthly = monthly[monthly.index.get_level_values("Ano").isin(anos)]
+    return compute_dre(monthly, salario_minimo, custo_contadora, custo_fornecedores_percentual, meses=1)
+
+
+# --- Simulação de Cenários ---
+def scenario_grid(totals, salarios, percentuais_fornecedores, custo_contadora, meses=1):
+    """DRE de cada combinação salário × % de fornecedores para o mesmo período, em um único passe.
+
+    `totals` tem as somas de Cartão, Dinheiro, Pix e Total do período. Retorna o DRE com
+    índice (salario, fornecedores_pct), uma linha por cenário.
+    """
+    salarios, percentuais = np.meshgrid(
+        np.asarray(salarios, dtype=np.float64), np.asarray(percentuais_fornecedores, dtype=np.float64), indexing="ij"
+    )
+    salarios, percentuais = salarios.ravel(), percentuais.ravel()
+    index = pd.MultiIndex.from_arrays([salarios, percentuais], names=["salario", "fornecedores_pct"])
+    periods = pd.DataFrame(
+        {col: np.full(len(index), float(totals[col])) for col in ["Cartão", "Dinheiro", "Pix", "Total"]}, index=index
+    )
+    return compute_dre(periods, salarios, custo_contadora, percentuais, meses)
+
+
+def break_even_supplier_pct(totals, salarios, custo_contadora, meses=1):
+    """Maior % de fornecedores que ainda zera o resultado, para cada salário (NaN sem receita)."""
+    salarios = np.asarray(salarios, dtype=np.float64)
+    receita_bruta = float(totals["Total"])
+    if receita_bruta <= 0:
+        return np.full(salarios.shape, np.nan)
+    receita_liquida = receita_bruta - (float(totals["Cartão"]) + float(totals["Pix"])) * ALIQUOTA_SIMPLES
+    despesas_fixas = (salarios * ENCARGOS_PESSOAL + custo_contadora) * meses
+    return (receita_liquida - despesas_fixas) / receita_bruta * 100
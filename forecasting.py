@@ -0,0 +1,141 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+# --- Projeção de Vendas ---
+# Linha de base sazonal: perfil por dia da semana × nível recente (média exponencial da série
+# dessazonalizada). A faixa de incerteza vem dos erros que a mesma projeção cometeu no
+# histórico da loja, horizonte a horizonte, sem modelo estatístico pesado: tudo são somas
+# acumuladas e operações vetorizadas, em milissegundos mesmo com anos de dados.
+
+MIN_SAMPLES = 8  # Projeções históricas mínimas por horizonte para estimar a faixa
+
+
+class SalesForecaster:
+    """Projeção diária a partir dos totais por dia (índice de datas), ajustada uma vez por versão dos dados.
+
+    Dias sem venda entram como zero no calendário. Dias da semana em que a loja não abre
+    (fator do perfil abaixo de `closed_threshold`) ficam fora do nível e projetam zero.
+    """
+
+    def __init__(self, daily_totals, alpha=0.1, profile_weeks=12, history_days=365,
+                 quantiles=(0.1, 0.9), closed_threshold=0.05):
+        self.alpha = alpha
+        self.history_days = history_days
+        self.quantiles = quantiles
+        self.profile = np.zeros(7)
+        self.level = 0.0
+        daily_totals = daily_totals.sort_index()
+        if daily_totals.empty:
+            self.index = pd.DatetimeIndex([])
+            self.last_date = None
+            return
+
+        self.index = pd.date_range(daily_totals.index.min(), daily_totals.index.max(), freq="D")
+        self.last_date = self.index[-1]
+        y = daily_totals.reindex(self.index, fill_value=0).to_numpy(dtype=np.float64)
+        dow = self.index.dayofweek.to_numpy()
+
+        # Perfil semanal das últimas semanas: média de cada dia da semana / média dos dias abertos
+        recent = slice(max(len(y) - profile_weeks * 7, 0), None)
+        sums = np.bincount(dow[recent], weights=y[recent], minlength=7)
+        counts = np.bincount(dow[recent], minlength=7)
+        means = np.divide(sums, counts, out=np.zeros(7), where=counts > 0)
+        if (means > 0).any():
+            self.profile = means / means[means > 0].mean()
+            self.profile[self.profile < closed_threshold] = 0.0
+
+        factors = self.profile[dow]
+        open_days = factors > 0
+        deseasonalized = np.full(len(y), np.nan)
+        np.divide(y, factors, out=deseasonalized, where=open_days)
+        # Nível ao fim de cada dia (a projeção feita naquele dia); dias fechados não decaem o nível
+        levels = pd.Series(deseasonalized).ewm(alpha=alpha, ignore_na=True).mean()
+        self._levels = levels.ffill().fillna(0.0).to_numpy()
+        self.level = float(self._levels[-1])
+        self._actual_cum = np.r_[0.0, np.cumsum(y)]
+        self._profile_cum = np.r_[0.0, np.cumsum(factors)]
+
+    def _error_bands(self, horizon):
+        """Quantis de realizado/projetado da soma dos próximos k dias, para k = 1..horizon (NaN sem histórico)."""
+        n = len(self._levels)
+        k = np.arange(1, horizon + 1)
+        origins = np.arange(max(n - 1 - self.history_days, 0), n - 1)
+        start = origins + 1
+        stop = start[:, None] + k[None, :]
+        valid = stop <= n
+        stop = np.minimum(stop, n)
+
+        actual = self._actual_cum[stop] - self._actual_cum[start][:, None]
+        expected = self._levels[origins][:, None] * (self._profile_cum[stop] - self._profile_cum[start][:, None])
+        valid &= expected > 0
+        ratios = np.full(expected.shape, np.nan)
+        np.divide(actual, expected, out=ratios, where=valid)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            lower, upper = np.nanquantile(ratios, self.quantiles, axis=0)
+        insufficient = valid.sum(axis=0) < MIN_SAMPLES
+        lower[insufficient] = np.nan
+        upper[insufficient] = np.nan
+        return lower, upper
+
+    def forecast(self, end):
+        """Projeção dia a dia do dia seguinte ao último com dados até `end`.
+
+        Colunas: Previsto (do dia), Acumulado (desde o último dia com dados) e a faixa
+        Inferior/Superior do acumulado.
+        """
+        columns = ["Previsto", "Acumulado", "Inferior", "Superior"]
+        end = pd.Timestamp(end).normalize()
+        if self.last_date is None or end <= self.last_date:
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([]), dtype=np.float64)
+
+        days = pd.date_range(self.last_date + pd.Timedelta(days=1), end, freq="D")
+        previsto = self.level * self.profile[days.dayofweek.to_numpy()]
+        acumulado = np.cumsum(previsto)
+        lower, upper = self._error_bands(len(days))
+        return pd.DataFrame({
+            "Previsto": previsto,
+            "Acumulado": acumulado,
+            "Inferior": acumulado * lower,
+            "Superior": acumulado * upper,
+        }, index=days)
+
+    def period_end(self, start, end):
+        """Realizado de `start` até o último dia com dados e projeção do total em `end`.
+
+        None se o período já terminou ou ainda não começou nos dados. Limites da faixa são
+        None quando o histórico não basta para estimá-los.
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        if self.last_date is None or not start <= self.last_date < end:
+            return None
+
+        realizado = float(self._actual_cum[-1] - self._actual_cum[self.index.searchsorted(start)])
+        diario = self.forecast(end)
+        final = diario.iloc[-1]
+
+        def bound(value):
+            return None if np.isnan(value) else realizado + float(value)
+
+        return {
+            "realizado": realizado,
+            "previsto": realizado + float(final["Acumulado"]),
+            "inferior": bound(final["Inferior"]),
+            "superior": bound(final["Superior"]),
+            "ultimo_dia": self.last_date,
+            "dias_restantes": len(diario),
+            "diario": diario,
+        }
+
+    def month_end(self, ano, mes):
+        """Projeção do fechamento do mês (ver period_end)."""
+        start = pd.Timestamp(int(ano), int(mes), 1)
+        return self.period_end(start, start + pd.offsets.MonthEnd(0))
+
+    def week_end(self, date):
+        """Projeção do fechamento da semana (segunda a domingo) que contém `date` (ver period_end)."""
+        date = pd.Timestamp(date).normalize()
+        start = date - pd.Timedelta(days=date.dayofweek)
+        return self.period_end(start, start + pd.Timedelta(days=6))
@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("clips.metrics")
+
+# Variável de ambiente que liga o log estruturado (uma linha JSON por rerun)
+METRICS_LOG_ENV = "CLIPS_METRICS_LOG"
+
+
+# --- Medição de um Rerun ---
+class RunProfiler:
+    """Tempos nomeados, contadores e tamanhos coletados durante uma execução do script.
+
+    Cada etapa de `main()` roda dentro de `span(nome)`; spans com o mesmo nome no mesmo
+    rerun são somados. `count` e `size` registram hits/misses de cache e bytes enviados.
+    """
+
+    def __init__(self):
+        self.spans = {}
+        self.counters = {}
+        self.sizes = {}
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.total_ms = None
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def size(self, name, nbytes):
+        self.sizes[name] = int(nbytes)
+
+    def finish(self):
+        """Fecha a medição do rerun e retorna o registro (dict serializável em JSON)."""
+        if self.total_ms is None:
+            self.total_ms = (time.perf_counter() - self._start) * 1000
+        return {
+            "inicio": self.started_at,
+            "total_ms": round(self.total_ms, 3),
+            "spans": {name: round(ms, 3) for name, ms in self.spans.items()},
+            "contadores": dict(self.counters),
+            "bytes": dict(self.sizes),
+        }
+
+
+# --- Agregação entre Reruns ---
+class MetricsStore:
+    """Últimos `max_runs` reruns de todas as sessões, agregados por span para o painel de diagnóstico."""
+
+    def __init__(self, max_runs=200):
+        self._runs = deque(maxlen=max_runs)
+        self._lock = threading.Lock()
+
+    def record(self, run):
+        with self._lock:
+            self._runs.append(run)
+        if metrics_log_enabled():
+            metrics_logger.info(json.dumps({"evento": "rerun", **run}, ensure_ascii=False))
+
+    def runs(self):
+        with self._lock:
+            return list(self._runs)
+
+    def summary(self):
+        """Uma linha por span (e o total do rerun): execuções, média, p50, p95, máximo e último valor em ms."""
+        runs = self.runs()
+        series = {"total": [run["total_ms"] for run in runs]}
+        for run in runs:
+            for name, ms in run["spans"].items():
+                series.setdefault(name, []).append(ms)
+
+        rows = []
+        for name, values in series.items():
+            if not values:
+                continue
+            arr = np.asarray(values, dtype=float)
+            p50, p95 = np.percentile(arr, [50, 95])
+            rows.append({
+                "etapa": name,
+                "execucoes": len(arr),
+                "media_ms": round(float(arr.mean()), 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "max_ms": round(float(arr.max()), 2),
+                "ultimo_ms": round(float(arr[-1]), 2),
+            })
+        return sorted(rows, key=lambda row: row["media_ms"], reverse=True)
+
+    def counter_totals(self):
+        """Soma dos contadores de todos os reruns guardados."""
+        totals = {}
+        for run in self.runs():
+            for name, n in run["contadores"].items():
+                totals[name] = totals.get(name, 0) + n
+        return totals
+
+
+# --- Log Estruturado ---
+def metrics_log_enabled():
+    return os.environ.get(METRICS_LOG_ENV, "").lower() in ("1", "true", "sim", "yes")
+
+
+def configure_metrics_log():
+    """Garante um handler para o logger de métricas quando o log estruturado estiver ligado."""
+    if metrics_log_enabled() and not metrics_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        metrics_logger.addHandler(handler)
+        metrics_logger.setLevel(logging.INFO)
+        metrics_logger.propagate = False
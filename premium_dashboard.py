@@ -2,6 +2,8 @@ import streamlit as st
 import streamlit.components.v1 as components
 from datetime import datetime
 import json
+import pandas as pd
+from rolling_analytics import RollingAnalytics
 
 # Registrar componentes customizados
 _animated_chart = components.declare_component(
@@ -31,8 +33,12 @@ def kpi_cards(data, theme="dark", key=None):
         key=key
     )
 
-def create_premium_dashboard(df_filtered):
-    """Cria dashboard premium com componentes animados"""
+def create_premium_dashboard(df_filtered, analytics=None):
+    """Cria dashboard premium com componentes animados
+
+    `analytics` (RollingAnalytics da série completa) fornece as variações dos KPIs; sem ele,
+    as janelas são calculadas só sobre as linhas filtradas.
+    """
     
     # CSS para tema escuro
     st.markdown("""
@@ -69,34 +75,43 @@ def create_premium_dashboard(df_filtered):
         # Preparar dados para KPIs
         total_vendas = df_filtered['Total'].sum()
         media_diaria = df_filtered['Total'].mean()
-        crescimento = 15.5  # Calcular baseado nos dados reais
+        if analytics is None:
+            analytics = RollingAnalytics.from_frame(df_filtered)
+        fim = df_filtered['Data'].max()
+        variacao_mes = analytics.delta("mes", fim)
+        variacao_media_semana = analytics.mean_delta("semana", fim)
+        crescimento = variacao_mes * 100 if variacao_mes is not None else 0.0
+        media_semana = variacao_media_semana * 100 if variacao_media_semana is not None else 0.0
+        variacao_trimestre = analytics.delta("trimestre", fim)
+        tendencia = variacao_trimestre * 100 if variacao_trimestre is not None else 0.0
+        melhor_vs_media = (df_filtered['Total'].max() / media_diaria - 1) * 100 if media_diaria > 0 else 0.0
         
         kpi_data = [
             {
                 "title": "Faturamento Total",
                 "value": f"R$ {total_vendas:,.0f}".replace(",", "."),
-                "change": crescimento,
+                "change": round(crescimento, 1),
                 "icon": "💰",
                 "color": "#64ffda"
             },
             {
                 "title": "Média Diária", 
                 "value": f"R$ {media_diaria:,.0f}".replace(",", "."),
-                "change": 8.2,
+                "change": round(media_semana, 1),
                 "icon": "📊",
                 "color": "#ff9800"
             },
             {
                 "title": "Melhor Dia",
                 "value": df_filtered.loc[df_filtered['Total'].idxmax(), 'DataFormatada'] if not df_filtered.empty else "N/A",
-                "change": 12.1,
+                "change": round(melhor_vs_media, 1),
                 "icon": "🏆", 
                 "color": "#4caf50"
             },
             {
                 "title": "Tendência",
-                "value": f"+{crescimento:.1f}%",
-                "change": crescimento,
+                "value": f"{tendencia:+.1f}%",
+                "change": round(tendencia, 1),
                 "icon": "📈",
                 "color": "#e91e63"
             }
@@ -108,15 +123,13 @@ def create_premium_dashboard(df_filtered):
         st.markdown("---")
         
         # Preparar dados para gráfico animado
-        chart_data = []
-        for _, row in df_filtered.iterrows():
-            chart_data.append({
-                "date": row['DataFormatada'],
-                "cartao": float(row['Cartão']),
-                "dinheiro": float(row['Dinheiro']),
-                "pix": float(row['Pix']),
-                "total": float(row['Total'])
-            })
+        chart_data = pd.DataFrame({
+            "date": df_filtered['DataFormatada'].astype(str).to_numpy(),
+            "cartao": df_filtered['Cartão'].to_numpy(dtype=float),
+            "dinheiro": df_filtered['Dinheiro'].to_numpy(dtype=float),
+            "pix": df_filtered['Pix'].to_numpy(dtype=float),
+            "total": df_filtered['Total'].to_numpy(dtype=float)
+        }).to_dict("records")
         
         # Controles do gráfico
         col1, col2 = st.columns([3, 1])
@@ -141,11 +154,11 @@ def create_premium_dashboard(df_filtered):
         st.error("Não há dados para exibir o dashboard premium.")
 
 # Função para integrar no app principal
-def integrate_premium_dashboard(df_filtered):
+def integrate_premium_dashboard(df_filtered, analytics=None):
     """Integra o dashboard premium no app principal"""
     
     # Adicionar tab premium
     tab_premium = st.container()
     
     with tab_premium:
-        create_premium_dashboard(df_filtered)
+        create_premium_dashboard(df_filtered, analytics)
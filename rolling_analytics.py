@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from rollups import MEASURES
+
+# --- Janelas Móveis e Variações ---
+WINDOWS = (7, 28, 90)
+# Comparação -> (janela, defasagem em dias). Defasagens múltiplas de 7 comparam os mesmos
+# dias da semana (364 dias no ano); a janela anterior só vale se estiver completa.
+COMPARISONS = {
+    "semana": (7, 7),
+    "mes": (28, 28),
+    "trimestre": (90, 91),
+    "ano": (28, 364),
+}
+
+
+class RollingAnalytics:
+    """Somas e médias móveis de 7/28/90 dias e variações semana/mês/trimestre/ano (das somas e das médias).
+
+    Tudo é calculado em um passe sobre a série diária preenchida no calendário (dias sem
+    venda entram com zero), via somas acumuladas: O(n) para todas as janelas e formas de
+    pagamento. As médias são por dia com venda, como a "média diária" do restante do app.
+    """
+
+    def __init__(self, daily, end=None):
+        if daily.empty:
+            self.index = pd.DatetimeIndex([])
+        else:
+            last = daily.index.max() if end is None else max(daily.index.max(), pd.Timestamp(end).normalize())
+            self.index = pd.date_range(daily.index.min(), last, freq="D")
+        n = len(self.index)
+
+        values = daily[MEASURES].reindex(self.index, fill_value=0).to_numpy(dtype=np.float64)
+        if "registros" in daily.columns:
+            trading = daily["registros"].reindex(self.index, fill_value=0).to_numpy() > 0
+        else:
+            trading = values[:, MEASURES.index("Total")] != 0
+        cumulative = np.vstack([np.zeros((1, len(MEASURES))), np.cumsum(values, axis=0)])
+        cumulative_days = np.r_[0, np.cumsum(trading)]
+
+        hi = np.arange(1, n + 1)
+        self.sums, self.means, self.trading_days = {}, {}, {}
+        for w in WINDOWS:
+            lo = np.maximum(hi - w, 0)
+            sums = cumulative[hi] - cumulative[lo]
+            days = cumulative_days[hi] - cumulative_days[lo]
+            means = np.full_like(sums, np.nan)
+            np.divide(sums, days[:, None], out=means, where=days[:, None] > 0)
+            self.sums[w] = pd.DataFrame(sums, index=self.index, columns=MEASURES)
+            self.means[w] = pd.DataFrame(means, index=self.index, columns=MEASURES)
+            self.trading_days[w] = pd.Series(days, index=self.index)
+
+        self.deltas, self.mean_deltas = {}, {}
+        for name, (w, lag) in COMPARISONS.items():
+            self.deltas[name] = self._lagged_change(self.sums[w], w, lag)
+            self.mean_deltas[name] = self._lagged_change(self.means[w], w, lag)
+
+    def _lagged_change(self, frame, w, lag):
+        """Variação relativa de cada linha sobre a de `lag` dias antes (NaN se a janela anterior estiver incompleta)."""
+        current = frame.to_numpy()
+        previous = np.full_like(current, np.nan)
+        if lag < len(current):
+            previous[lag:] = current[:-lag]
+        previous[np.arange(len(current)) - lag < w - 1] = np.nan
+        change = np.full_like(current, np.nan)
+        np.divide(current, previous, out=change, where=previous > 0)
+        return pd.DataFrame(change - 1, index=self.index, columns=MEASURES)
+
+    @classmethod
+    def from_frame(cls, df, end=None):
+        """Constrói a partir das linhas de venda (colunas Data e formas de pagamento)."""
+        if df.empty:
+            return cls(pd.DataFrame(columns=MEASURES, index=pd.DatetimeIndex([])), end)
+        daily = df.groupby(df["Data"].dt.normalize())[MEASURES].sum()
+        daily["registros"] = df.groupby(df["Data"].dt.normalize()).size()
+        return cls(daily, end)
+
+    def _position(self, date):
+        if date is None:
+            return len(self.index) - 1
+        return min(self.index.searchsorted(pd.Timestamp(date).normalize(), side="right"), len(self.index)) - 1
+
+    def window(self, days, date=None, measure="Total"):
+        """Soma, média por dia com venda e dias com venda da janela de `days` dias terminada em `date`."""
+        pos = self._position(date)
+        if pos < 0:
+            return {"soma": 0.0, "media": None, "dias": 0}
+        media = self.means[days][measure].iat[pos]
+        return {
+            "soma": float(self.sums[days][measure].iat[pos]),
+            "media": None if np.isnan(media) else float(media),
+            "dias": int(self.trading_days[days].iat[pos]),
+        }
+
+    def delta(self, comparison, date=None, measure="Total"):
+        """Variação relativa (0.12 = +12%) da soma da comparação em `date`; None sem histórico suficiente."""
+        return self._value(self.deltas[comparison], date, measure)
+
+    def mean_delta(self, comparison, date=None, measure="Total"):
+        """Como delta, mas da média por dia com venda (ex.: média dos últimos 7 dias vs a dos 7 anteriores)."""
+        return self._value(self.mean_deltas[comparison], date, measure)
+
+    def _value(self, frame, date, measure):
+        pos = self._position(date)
+        if pos < 0:
+            return None
+        value = frame[measure].iat[pos]
+        return None if np.isnan(value) else float(value)
+
+    def snapshot(self, date=None):
+        """Tabela (forma de pagamento × indicador) com janelas e variações em `date`."""
+        pos = self._position(date)
+        columns = {}
+        for w in WINDOWS:
+            columns[f"soma_{w}d"] = self.sums[w].iloc[pos] if pos >= 0 else np.nan
+            columns[f"media_{w}d"] = self.means[w].iloc[pos] if pos >= 0 else np.nan
+        for name in COMPARISONS:
+            columns[f"var_{name}"] = self.deltas[name].iloc[pos] if pos >= 0 else np.nan
+        return pd.DataFrame(columns, index=MEASURES)
@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+from sales_pipeline import date_bounds
+
+# --- Cubo de Agregados de Vendas ---
+MEASURES = ["Cartão", "Dinheiro", "Pix", "Total"]
+COUNT_COLUMNS = ["registros", "dias"]
+LEVEL_COLUMNS = MEASURES + [f"{m}_min" for m in MEASURES] + [f"{m}_max" for m in MEASURES] + COUNT_COLUMNS
+
+
+def _aggregate(frame, keys):
+    """Soma, mínimo e máximo de cada medida por chave, mais contagem de registros e de dias (tudo float64)."""
+    grouped = frame.groupby(keys)
+    out = pd.concat([
+        grouped[MEASURES].sum(),
+        grouped[MEASURES].min().add_suffix("_min"),
+        grouped[MEASURES].max().add_suffix("_max"),
+    ], axis=1)
+    out["registros"] = grouped["registros"].sum()
+    out["dias"] = grouped["dias"].sum()
+    return out.astype(np.float64)
+
+
+def _week_range(semana):
+    return semana, semana + pd.Timedelta(days=6)
+
+
+def _month_range(chave):
+    inicio = pd.Timestamp(year=int(chave[0]), month=int(chave[1]), day=1)
+    return inicio, inicio + pd.offsets.MonthEnd(0)
+
+
+def _year_range(ano):
+    return pd.Timestamp(year=int(ano), month=1, day=1), pd.Timestamp(year=int(ano), month=12, day=31)
+
+
+def _period_row(values):
+    """Linha agregada (mesma ordem de colunas de `_aggregate`) a partir das linhas diárias em array."""
+    k = len(MEASURES)
+    totals = values[:, :k]
+    return np.concatenate([totals.sum(axis=0), totals.min(axis=0), totals.max(axis=0), values[:, 3 * k:].sum(axis=0)])
+
+
+def _refresh_periods(level, daily, keys, period_range):
+    """Recalcula em `level` só as linhas das chaves em `keys`, a partir do intervalo de dias de cada uma."""
+    daily_values = daily.to_numpy()
+    rows = {}
+    for key in keys.unique():
+        i, j = date_bounds(daily.index, *period_range(key))
+        rows[key] = _period_row(daily_values[i:j])
+
+    values = level.to_numpy(copy=True)
+    positions = level.index.get_indexer(list(rows))
+    for pos, row in zip(positions, rows.values()):
+        if pos >= 0:
+            values[pos] = row
+    out = pd.DataFrame(values, index=level.index, columns=level.columns)
+
+    new_keys = [key for pos, key in zip(positions, rows) if pos < 0]
+    if new_keys:
+        if isinstance(level.index, pd.MultiIndex):
+            index = pd.MultiIndex.from_arrays(
+                [np.array(col, dtype=lvl.dtype) for col, lvl in zip(zip(*new_keys), level.index.levels)],
+                names=level.index.names,
+            )
+        else:
+            index = pd.Index(new_keys, dtype=level.index.dtype, name=level.index.name)
+        added = pd.DataFrame([rows[key] for key in new_keys], index=index, columns=level.columns)
+        out = pd.concat([out, added]).sort_index()
+    return out
+
+
+class SalesRollup:
+    """Agregados de Cartão/Dinheiro/Pix/Total por dia, semana ISO, mês e ano.
+
+    O nível diário resume as linhas de cada dia; semana, mês e ano são agregados a partir
+    dele, então min/max nesses níveis se referem ao total diário. É construído uma vez por
+    versão dos dados e as consultas não percorrem as linhas brutas.
+    """
+
+    def __init__(self, df):
+        self._set_daily(self._build_daily(df))
+
+    def _set_daily(self, daily):
+        self.daily = daily
+        idx = self.daily.index
+        self.weekly = _aggregate(self.daily, idx - pd.to_timedelta(idx.dayofweek, unit="D"))
+        self.weekly.index.name = "Semana"
+        self.monthly = _aggregate(self.daily, [idx.year.rename("Ano"), idx.month.rename("Mês")])
+        self.yearly = _aggregate(self.daily, idx.year.rename("Ano"))
+        # Somas acumuladas para consultas de intervalo arbitrário em O(log n)
+        values = self.daily[MEASURES + COUNT_COLUMNS].to_numpy(dtype=np.float64)
+        self._cumulative = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+
+    @staticmethod
+    def _build_daily(df):
+        if df.empty:
+            return pd.DataFrame(np.empty((0, len(LEVEL_COLUMNS))), index=pd.DatetimeIndex([], name="Data"), columns=LEVEL_COLUMNS)
+        # Reduções por trecho contíguo de cada dia (NumPy), sem o custo fixo do groupby
+        days = df["Data"].dt.normalize().to_numpy()
+        order = np.argsort(days, kind="stable")
+        days = days[order]
+        values = df[MEASURES].to_numpy(dtype=np.float64)[order]
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        counts = np.diff(np.r_[starts, len(days)])
+        data = np.column_stack([
+            np.add.reduceat(values, starts),
+            np.minimum.reduceat(values, starts),
+            np.maximum.reduceat(values, starts),
+            counts,
+            np.ones(len(starts)),
+        ])
+        return pd.DataFrame(data, index=pd.DatetimeIndex(days[starts], name="Data"), columns=LEVEL_COLUMNS)
+
+    @classmethod
+    def combine(cls, rollups):
+        """Cubo consolidado de várias lojas a partir dos cubos de cada uma, sem reler as linhas.
+
+        Dias presentes em mais de uma loja somam medidas e registros e contam uma vez em `dias`;
+        o custo é linear no total de dias das lojas.
+        """
+        rollups = [rollup for rollup in rollups if not rollup.daily.empty]
+        if len(rollups) == 1:
+            return rollups[0]
+        if not rollups:
+            return cls(pd.DataFrame())
+
+        grouped = pd.concat([rollup.daily for rollup in rollups]).groupby(level=0, sort=True)
+        daily = pd.concat([
+            grouped[MEASURES + ["registros"]].sum(),
+            grouped[[f"{m}_min" for m in MEASURES]].min(),
+            grouped[[f"{m}_max" for m in MEASURES]].max(),
+        ], axis=1)
+        daily["dias"] = 1.0
+        daily = daily[LEVEL_COLUMNS].astype(np.float64)
+        daily.index = pd.DatetimeIndex(daily.index, name="Data")
+
+        combined = cls.__new__(cls)
+        combined._set_daily(daily)
+        return combined
+
+    def apply_rows(self, df):
+        """Nova versão do cubo com as linhas de `df` acrescentadas.
+
+        Só os dias, semanas, meses e anos tocados pelas linhas são recalculados; o cubo
+        atual não é alterado, então versões antigas continuam válidas para quem as lê.
+        """
+        if df.empty:
+            return self
+        if self.daily.empty:
+            return SalesRollup(df)
+
+        delta = self._build_daily(df)
+        touched = delta.index
+        k = len(MEASURES)
+        values = self.daily.to_numpy(copy=True)
+        positions = self.daily.index.get_indexer(touched)
+        known = positions >= 0
+        if known.any():
+            # Dias já existentes: soma, mínimo/máximo e registros combinados com as linhas novas
+            old, new = values[positions[known]], delta.to_numpy()[known]
+            old[:, :k] += new[:, :k]
+            old[:, k:2 * k] = np.fmin(old[:, k:2 * k], new[:, k:2 * k])
+            old[:, 2 * k:3 * k] = np.fmax(old[:, 2 * k:3 * k], new[:, 2 * k:3 * k])
+            old[:, 3 * k] += new[:, 3 * k]
+            values[positions[known]] = old
+        daily = pd.DataFrame(values, index=self.daily.index, columns=self.daily.columns)
+        if not known.all():
+            daily = pd.concat([daily, delta[~known]]).sort_index()
+
+        rollup = SalesRollup.__new__(SalesRollup)
+        rollup.daily = daily
+        rollup.weekly = _refresh_periods(self.weekly, daily, touched - pd.to_timedelta(touched.dayofweek, unit="D"), _week_range)
+        rollup.monthly = _refresh_periods(self.monthly, daily, pd.MultiIndex.from_arrays([touched.year, touched.month]), _month_range)
+        rollup.yearly = _refresh_periods(self.yearly, daily, touched.year, _year_range)
+
+        # Somas acumuladas: só o trecho a partir do primeiro dia tocado muda
+        first = daily.index.searchsorted(touched.min())
+        values = daily[MEASURES + COUNT_COLUMNS].to_numpy(dtype=np.float64)
+        cumulative = np.empty((len(daily) + 1, values.shape[1]))
+        cumulative[:first + 1] = self._cumulative[:first + 1]
+        cumulative[first + 1:] = self._cumulative[first] + np.cumsum(values[first:], axis=0)
+        rollup._cumulative = cumulative
+        return rollup
+
+    def level(self, name):
+        """Retorna o nível pedido: 'dia', 'semana', 'mes' ou 'ano'."""
+        return {"dia": self.daily, "semana": self.weekly, "mes": self.monthly, "ano": self.yearly}[name]
+
+    def range_totals(self, start, end):
+        """Somas e contagens entre `start` e `end` (inclusive), via busca binária no nível diário."""
+        i, j = date_bounds(self.daily.index, start, end)
+        totals = self._cumulative[j] - self._cumulative[i]
+        return dict(zip(MEASURES + COUNT_COLUMNS, totals))
+
+    def month(self, ano, mes):
+        """Agregados de um mês; zeros se não houver vendas."""
+        try:
+            return self.monthly.loc[(ano, mes)]
+        except KeyError:
+            return pd.Series(0.0, index=self.monthly.columns)
+
+    def months_of_year(self, ano):
+        """Agregados mensais do ano com os 12 meses presentes (meses sem venda zerados)."""
+        if ano in self.yearly.index:
+            months = self.monthly.xs(ano, level="Ano")
+        else:
+            months = self.monthly.iloc[0:0].droplevel("Ano")
+        return months.reindex(range(1, 13), fill_value=0).rename_axis("Mês")
+
+    def days(self, start, end):
+        """Totais diários entre `start` e `end` (inclusive), com as colunas usadas pelos gráficos."""
+        i, j = date_bounds(self.daily.index, start, end)
+        days = self.daily.iloc[i:j].reset_index()
+        days["Ano"] = days["Data"].dt.year
+        days["Mês"] = days["Data"].dt.month
+        days["Dia"] = days["Data"].dt.day
+        return days
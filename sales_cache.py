@@ -0,0 +1,58 @@
+import threading
+from rollups import SalesRollup
+from sales_pipeline import append_sales_rows, data_version
+
+
+# --- Cache Versionado de Vendas ---
+class SalesCache:
+    """Dados processados da planilha com as vendas da fila de gravação mescladas de forma incremental.
+
+    A versão é `<versão da base>+<n vendas mescladas>`. Enquanto a base não muda, cada
+    venda nova só é convertida e somada ao cubo de agregados (dia, semana, mês e ano
+    tocados); uma base nova (releitura da planilha) recomeça a partir dela.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._base_version = None
+        self._frame = None
+        self._rollup = None
+        self._applied = []
+        self._lock = threading.Lock()
+
+    def view(self, base_frame, entries):
+        """DataFrame da base mais as entradas (id, linha) da fila, reaproveitando o que já foi mesclado."""
+        base_version = data_version(base_frame)
+        ids = [entry_id for entry_id, _ in entries]
+        with self._lock:
+            if base_version != self._base_version or ids[:len(self._applied)] != self._applied:
+                self._base_version = base_version
+                self._frame = base_frame
+                self._rollup = None
+                self._applied = []
+
+            new_rows = [row for _, row in entries[len(self._applied):]]
+            if new_rows:
+                merged = append_sales_rows(self._frame, new_rows)
+                if merged is not self._frame:
+                    if self._rollup is not None:
+                        self._rollup = self._rollup.apply_rows(merged.iloc[len(self._frame):])
+                    merged.attrs["data_version"] = f"{base_version}+{len(ids)}"
+                    self._frame = merged
+                self._applied = ids
+
+            self.version = data_version(self._frame)
+            # Cópia rasa: as sessões compartilham os dados, mas não o objeto
+            return self._frame.copy(deep=False)
+
+    def rollup(self):
+        """(versão, cubo de agregados) da versão atual, lidos juntos sob o lock.
+
+        Use a versão devolvida aqui como chave de cache do cubo: lida em separado, uma
+        venda mesclada entre as duas chamadas deixaria o cubo novo sob a versão antiga.
+        O cubo é construído na primeira consulta e depois só atualizado.
+        """
+        with self._lock:
+            if self._rollup is None:
+                self._rollup = SalesRollup(self._frame)
+            return self.version, self._rollup
@@ -0,0 +1,408 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from snapshot_store import start_background
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes do Pipeline de Vendas ---
+PAYMENT_COLUMNS = ["Cartão", "Dinheiro", "Pix"]
+meses_ordem = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+dias_semana_ordem = ["Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira", "Sexta-feira", "Sábado", "Domingo"]
+# Formato dominante primeiro; os demais só são tentados nas linhas que falharem
+DATE_FORMATS = ["%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d"]
+
+
+# --- Normalização de Datas ---
+DateParseReport = namedtuple("DateParseReport", ["total", "primary", "fallback", "blank", "invalid"])
+DateParseReport.__doc__ = "Contagem de linhas por resultado da conversão de datas."
+
+
+def merge_date_reports(a, b):
+    """Soma dois relatórios de conversão de datas."""
+    if a is None:
+        return b
+    return DateParseReport(*(x + y for x, y in zip(a, b)))
+
+
+def normalize_dates(values, formats=DATE_FORMATS, dayfirst_fallback=True):
+    """Converte datas em um passe vetorizado no formato dominante, reprocessando só as falhas.
+
+    Retorna (Series datetime64, DateParseReport). Linhas que nenhum formato reconhece ficam NaT.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        blank = int(values.isna().sum())
+        return values, DateParseReport(len(values), len(values) - blank, 0, blank, 0)
+
+    text = values.astype("string").str.strip()
+    blank_mask = text.isna() | (text == "")
+    parsed = pd.to_datetime(text, format=formats[0], errors="coerce")
+    primary = int(parsed.notna().sum())
+
+    failed = parsed.isna() & ~blank_mask
+    for fmt in formats[1:]:
+        if not failed.any():
+            break
+        retry = pd.to_datetime(text[failed], format=fmt, errors="coerce")
+        parsed.loc[retry.index] = retry
+        failed &= parsed.isna()
+
+    if dayfirst_fallback and failed.any():
+        # Texto que começa pelo ano (ex.: TIMESTAMP do SQLite) é ano-mês-dia: dayfirst inverteria dia e mês
+        year_first = text.str.match(r"\d{4}\D").fillna(False).astype(bool)
+        for mask, dayfirst in ((failed & ~year_first, True), (failed & year_first, False)):
+            if mask.any():
+                retry = pd.to_datetime(text[mask], format="mixed", dayfirst=dayfirst, errors="coerce")
+                parsed.loc[retry.index] = retry
+        failed &= parsed.isna()
+
+    invalid = int(failed.sum())
+    blank = int(blank_mask.sum())
+    report = DateParseReport(len(values), primary, len(values) - primary - blank - invalid, blank, invalid)
+    return parsed, report
+
+
+# --- Processamento das Linhas da Planilha ---
+def build_sales_frame(header, rows):
+    """Converte linhas brutas da planilha (sem o cabeçalho) em DataFrame processado.
+
+    Retorna (df, DateParseReport).
+    """
+    if not rows:
+        return pd.DataFrame(), DateParseReport(0, 0, 0, 0, 0)
+
+    width = len(header)
+    rows = [list(row[:width]) + [""] * (width - len(row)) for row in rows]
+    df = pd.DataFrame(rows, columns=header)
+
+    for col in PAYMENT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+        else:
+            df[col] = 0
+
+    if "Data" not in df.columns:
+        raise ValueError("Coluna 'Data' não encontrada na planilha!")
+
+    df["Data"], report = normalize_dates(df["Data"])
+    df.dropna(subset=["Data"], inplace=True)
+    if df.empty:
+        return pd.DataFrame(), report
+
+    df["Total"] = df["Cartão"] + df["Dinheiro"] + df["Pix"]
+    add_derived_columns(df)
+
+    return index_by_date(df.sort_values("Data")), report
+
+
+# --- Índice de Datas e Fatiamento por Período ---
+def index_by_date(df):
+    """Usa 'Data' (já ordenada) como DatetimeIndex, mantendo também a coluna."""
+    # Índice sem nome: evita ambiguidade com a coluna 'Data' em groupby/merge
+    df.index = pd.DatetimeIndex(df["Data"]).rename(None)
+    return df
+
+
+def date_bounds(index, start, end):
+    """Posições [i, j) do intervalo de dias start..end (inclusive) em um DatetimeIndex ordenado."""
+    i = index.searchsorted(pd.Timestamp(start).normalize(), side="left")
+    j = index.searchsorted(pd.Timestamp(end).normalize() + pd.Timedelta(days=1), side="left")
+    return i, j
+
+
+def slice_dates(df, start, end):
+    """Linhas entre start e end (inclusive) por busca binária, sem máscara booleana nem cópia."""
+    if df.empty:
+        return df
+    if not isinstance(df.index, pd.DatetimeIndex) or not df.index.is_monotonic_increasing:
+        df = index_by_date(df.sort_values("Data"))
+    i, j = date_bounds(df.index, start, end)
+    return df.iloc[i:j]
+
+
+def slice_year(df, ano):
+    """Linhas do ano informado."""
+    return slice_dates(df, datetime(ano, 1, 1), datetime(ano, 12, 31))
+
+
+def slice_month(df, ano, mes):
+    """Linhas do mês informado."""
+    inicio = datetime(ano, mes, 1)
+    fim = (inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return slice_dates(df, inicio, fim)
+
+
+def slice_week(df, dia):
+    """Linhas da semana (segunda a domingo) que contém `dia`."""
+    inicio = pd.Timestamp(dia).normalize() - pd.Timedelta(days=pd.Timestamp(dia).weekday())
+    return slice_dates(df, inicio, inicio + pd.Timedelta(days=6))
+
+
+def data_version(df):
+    """Versão dos dados (hash do conteúdo), calculada uma vez e guardada em `df.attrs`."""
+    version = df.attrs.get("data_version")
+    if version is None:
+        if df.empty:
+            version = "vazio"
+        else:
+            cols = [col for col in ["Data"] + PAYMENT_COLUMNS if col in df.columns]
+            version = format(int(pd.util.hash_pandas_object(df[cols], index=False).sum()), "016x")
+        df.attrs["data_version"] = version
+    return version
+
+
+# --- Colunas Derivadas ---
+def add_derived_columns(df):
+    """Acrescenta Ano/Mês/Dia/MêsNome/DiaSemana a partir de 'Data' com lookups vetorizados.
+
+    Inteiros pequenos viram int16/int8 e MêsNome é categórica (códigos = mês - 1).
+    """
+    data = df["Data"].dt
+    mes = data.month.to_numpy(dtype=np.int8)
+    df["Ano"] = data.year.astype(np.int16)
+    df["Mês"] = mes
+    df["Dia"] = data.day.astype(np.int8)
+    df["MêsNome"] = pd.Categorical.from_codes(mes - 1, categories=meses_ordem, ordered=True)
+    df["DiaSemana"] = data.dayofweek.astype(np.int8)
+    return df
+
+
+def add_display_columns(df):
+    """Acrescenta as colunas de exibição do app financeiro: AnoMês, DataFormatada, DiaSemana (nome) e DiaDoMes.
+
+    Os textos são formatados uma vez por valor distinto e guardados como categorias.
+    """
+    codes, dias = pd.factorize(df["Data"].dt.normalize(), sort=True)
+    df["DataFormatada"] = pd.Categorical.from_codes(codes, categories=dias.strftime("%d/%m/%Y"))
+
+    ano_mes = df["Ano"].to_numpy(dtype=np.int32) * 100 + df["Mês"].to_numpy(dtype=np.int32)
+    codes, chaves = pd.factorize(ano_mes, sort=True)
+    df["AnoMês"] = pd.Categorical.from_codes(codes, categories=[f"{k // 100}-{k % 100:02d}" for k in chaves], ordered=True)
+
+    df["DiaSemana"] = pd.Categorical.from_codes(df["Data"].dt.dayofweek.to_numpy(dtype=np.int8), categories=dias_semana_ordem, ordered=True)
+    df["DiaDoMes"] = df["Dia"]
+    return df
+
+
+def _align_categories(base, extra, sort_key):
+    """Converte as duas Series categóricas para a união das categorias, ordenada por `sort_key`."""
+    novas = extra.cat.categories.difference(base.cat.categories)
+    if novas.empty:
+        return base, extra.cat.set_categories(base.cat.categories)
+    categorias = sorted(base.cat.categories.append(novas), key=sort_key)
+    return base.cat.set_categories(categorias), extra.cat.set_categories(categorias)
+
+
+def append_sales_rows(df, rows):
+    """Acrescenta linhas [Data, Cartão, Dinheiro, Pix] ainda não relidas da planilha a um DataFrame já processado.
+
+    Só as linhas novas passam pela conversão e pelas colunas derivadas; as categorias de
+    exibição do DataFrame existente só são recodificadas quando aparece um dia ou mês novo.
+    """
+    if not rows:
+        return df
+    extra = pd.DataFrame([list(row[:4]) for row in rows], columns=["Data"] + PAYMENT_COLUMNS)
+    for col in PAYMENT_COLUMNS:
+        extra[col] = pd.to_numeric(extra[col], errors="coerce").fillna(0)
+    extra["Data"], _ = normalize_dates(extra["Data"])
+    extra = extra.dropna(subset=["Data"])
+    if extra.empty:
+        return df
+
+    extra["Total"] = extra["Cartão"] + extra["Dinheiro"] + extra["Pix"]
+    add_derived_columns(extra)
+    if "DataFormatada" in df.columns and isinstance(df["DataFormatada"].dtype, pd.CategoricalDtype):
+        add_display_columns(extra)
+        sort_keys = {"DataFormatada": lambda d: d[6:] + d[3:5] + d[:2], "AnoMês": None}
+        df = df.copy(deep=False)
+        for col, sort_key in sort_keys.items():
+            df[col], extra[col] = _align_categories(df[col], extra[col], sort_key)
+    return pd.concat([df, extra], ignore_index=True)
+
+
+# --- Sincronização Incremental ---
+class SalesSheetSync:
+    """Mantém o DataFrame de vendas sincronizado com a fonte baixando apenas as linhas novas.
+
+    A cada sincronização relê as últimas `overlap_rows` linhas já conhecidas junto com as
+    novas; se elas mudaram (edição ou exclusão de linhas antigas) faz uma recarga completa.
+    Como edições no meio da planilha não aparecem nessa janela, uma recarga completa também
+    é feita a cada `full_reload_every` sincronizações.
+
+    Com um `snapshot` (SnapshotStore) o estado é persistido em disco: após um restart o
+    DataFrame é servido direto do snapshot enquanto o SalesRefresher reconcilia com a
+    planilha. `as_of` é o instante da última leitura bem-sucedida (ou do snapshot).
+    """
+
+    def __init__(self, overlap_rows=3, full_reload_every=6, snapshot=None):
+        self.overlap_rows = overlap_rows
+        self.full_reload_every = full_reload_every
+        self.header = None
+        self.frame = pd.DataFrame()
+        self.synced_rows = 0
+        self.tail_rows = []
+        self.syncs_since_full = 0
+        self.last_mode = None
+        self.date_report = None
+        self.snapshot = snapshot
+        self.pending_reconcile = False
+        self.as_of = None
+        self._lock = threading.Lock()
+        if snapshot is not None:
+            self._restore()
+
+    def sync(self, source):
+        """Atualiza e retorna o DataFrame processado a partir da fonte (SalesDataSource)."""
+        with self._lock:
+            frame_before = self.frame
+            if self.header is None or self.syncs_since_full >= self.full_reload_every:
+                self._full_reload(source)
+            else:
+                self._incremental(source)
+            self.pending_reconcile = False
+            self.as_of = datetime.now()
+            if self.frame is not frame_before:
+                self.frame.attrs.pop("data_version", None)
+                data_version(self.frame)
+                self._persist()
+            return self.frame
+
+    def _restore(self):
+        df, meta = self.snapshot.load()
+        if df is None or not meta.get("header"):
+            return
+        self.header = meta["header"]
+        self.frame = index_by_date(df)
+        data_version(self.frame)
+        self.synced_rows = meta.get("synced_rows", 0)
+        self.tail_rows = meta.get("tail_rows", [])
+        if meta.get("date_report"):
+            self.date_report = DateParseReport(*meta["date_report"])
+        self.last_mode = "snapshot"
+        self.pending_reconcile = True
+        if meta.get("saved_at"):
+            self.as_of = datetime.fromtimestamp(meta["saved_at"])
+
+    def _persist(self):
+        if self.snapshot is None or self.header is None:
+            return
+        self.snapshot.save(self.frame, {
+            "header": self.header,
+            "synced_rows": self.synced_rows,
+            "tail_rows": self.tail_rows,
+            "date_report": list(self.date_report) if self.date_report else None,
+        })
+
+    def _pad(self, row):
+        width = len(self.header)
+        return [str(v) for v in row[:width]] + [""] * (width - len(row))
+
+    def _full_reload(self, source):
+        values = source.read_all()
+        self.syncs_since_full = 0
+        self.last_mode = "completa"
+        if not values:
+            self.header = None
+            self.frame = pd.DataFrame()
+            self.date_report = None
+            self.synced_rows = 0
+            self.tail_rows = []
+            return
+
+        self.header = [str(h) for h in values[0]]
+        rows = [self._pad(row) for row in values[1:]]
+        self.frame, self.date_report = build_sales_frame(self.header, rows)
+        self.synced_rows = len(rows)
+        self.tail_rows = rows[-self.overlap_rows:] if self.overlap_rows else []
+
+    def _incremental(self, source):
+        overlap = min(self.overlap_rows, self.synced_rows)
+        first_row = self.synced_rows - overlap
+        values = [self._pad(row) for row in source.read_from(first_row, len(self.header))]
+
+        if overlap and values[:overlap] != self.tail_rows[-overlap:]:
+            # Linhas já sincronizadas mudaram ou foram removidas
+            self._full_reload(source)
+            return
+
+        self.syncs_since_full += 1
+        self.last_mode = "incremental"
+        new_rows = values[overlap:]
+        if not new_rows:
+            return
+
+        new_frame, report = build_sales_frame(self.header, new_rows)
+        self.date_report = merge_date_reports(self.date_report, report)
+        self.synced_rows += len(new_rows)
+        self.tail_rows = (self.tail_rows + new_rows)[-self.overlap_rows:]
+        if new_frame.empty:
+            return
+        if self.frame.empty:
+            self.frame = new_frame
+            return
+
+        combined = pd.concat([self.frame, new_frame])
+        if new_frame["Data"].iloc[0] < self.frame["Data"].iloc[-1]:
+            combined = combined.sort_values("Data", kind="stable")
+        self.frame = combined
+
+
+# --- Atualização em Segundo Plano ---
+class SalesRefresher:
+    """Relê a fonte em segundo plano a cada `interval` segundos (stale-while-revalidate).
+
+    As leituras da página sempre devolvem o último `sync.frame` já pronto; a thread troca
+    o DataFrame por inteiro ao fim de cada sincronização, então nenhuma requisição espera
+    pela planilha. Um snapshot ainda não conferido é reconciliado logo na primeira volta.
+    """
+
+    def __init__(self, sync, source, interval=300):
+        self.sync = sync
+        self.source = source
+        self.interval = interval
+        self.last_error = None
+        self.last_attempt = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Inicia a thread de atualização (uma única vez)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = start_background(self._run, "atualiza-vendas")
+
+    def refresh_now(self):
+        """Antecipa a próxima sincronização."""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            if not self._reconcile_pending():
+                self._wake.wait(self.interval)
+                self._wake.clear()
+            try:
+                self._refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("Falha ao atualizar os dados de vendas em segundo plano.")
+            self.last_attempt = time.time()
+
+    def _reconcile_pending(self):
+        """Snapshot ainda não conferido com a fonte: sincroniza sem esperar o intervalo."""
+        return self.sync.pending_reconcile
+
+    def _refresh(self):
+        """Uma volta de atualização; levanta exceção se a leitura falhar."""
+        try:
+            self.sync.sync(self.source)
+        except Exception:
+            # Sem isso um snapshot com fonte fora do ar seria retentado sem pausa
+            self.sync.pending_reconcile = False
+            raise
@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow é opcional: sem ele o app só não persiste snapshots
+    pa = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+
+# --- Snapshot Colunar em Disco ---
+class SnapshotStore:
+    """Snapshot colunar (Feather/Arrow) do DataFrame processado, com metadados em JSON ao lado."""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta_path = path + ".json"
+
+    @property
+    def available(self):
+        return feather is not None
+
+    def load(self):
+        """Carrega o snapshot via memory-map. Retorna (df, meta) ou (None, None) se não houver."""
+        if not self.available or not os.path.exists(self.path):
+            return None, None
+        try:
+            table = feather.read_table(self.path, memory_map=True)
+            df = table.to_pandas(split_blocks=True)
+            meta = {}
+            if os.path.exists(self.meta_path):
+                with open(self.meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+            return df, meta
+        except Exception:
+            logger.exception("Snapshot %s ilegível; ignorando.", self.path)
+            return None, None
+
+    def save(self, df, meta=None):
+        """Grava o snapshot de forma atômica (arquivo temporário + rename)."""
+        if not self.available or df is None:
+            return False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        df = df.reset_index(drop=True)
+        tmp_path = self.path + ".tmp"
+        try:
+            try:
+                # Sem compressão para que a leitura memory-mapped não precise descomprimir
+                feather.write_feather(df, tmp_path, compression="uncompressed")
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Colunas extras da planilha com tipos misturados viram texto
+                mixed = df.select_dtypes(include="object").columns
+                df = df.astype({col: str for col in mixed})
+                feather.write_feather(df, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, self.path)
+
+            meta = dict(meta or {})
+            meta["saved_at"] = time.time()
+            with open(self.meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(self.meta_path + ".tmp", self.meta_path)
+            return True
+        except Exception:
+            logger.exception("Falha ao gravar snapshot %s.", self.path)
+            return False
+
+
+def start_background(target, name):
+    """Executa `target` em uma thread daemon de longa duração.
+
+    A thread não recebe o contexto de execução da sessão que a criou (ela sobrevive à
+    sessão): `target` não deve chamar `st.*`; avisos voltam às sessões pelos dados publicados.
+    """
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    thread.start()
+    return thread
+
@@ -0,0 +1,58 @@
+import html
+import numpy as np
+import pandas as pd
+
+# --- Renderização em Lote de Listas Resumidas ---
+# Cada st.markdown é uma mensagem separada no websocket; listas como o faturamento mensal
+# são montadas aqui em um único bloco HTML, com a formatação feita de uma vez por coluna.
+
+_BRL_TABLE = str.maketrans({",": ".", ".": ","})
+
+
+def format_brl_series(values):
+    """Formata valores em reais ("R$ 1.234,56") em um passe; ausentes viram "R$ 0,00"."""
+    values = pd.Series(values, dtype="float64").fillna(0).round(2)
+    return "R$ " + values.map("{:,.2f}".format).str.translate(_BRL_TABLE)
+
+
+def format_delta_series(values, decimals=1):
+    """Variações relativas (0.125 -> "+12,5%"); ausentes ou infinitas viram "—"."""
+    values = pd.Series(values, dtype="float64")
+    valid = np.isfinite(values)
+    text = (values * 100).round(decimals).map(f"{{:+.{decimals}f}}%".format).str.replace(".", ",", regex=False)
+    return text.where(valid, "—")
+
+
+def year_over_year(current, previous):
+    """Variação de `current` sobre `previous` (mesmo índice); NaN onde algum dos dois é zero."""
+    current = np.asarray(current, dtype=np.float64)
+    previous = np.asarray(previous, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = current / previous - 1
+    delta[(previous == 0) | (current == 0)] = np.nan
+    return delta
+
+
+def render_summary_list(labels, values, deltas=None, empty_message="Nenhum dado para o período."):
+    """HTML da lista rótulo/valor (com variação opcional) em um único bloco, pronto para st.markdown."""
+    labels = [html.escape(str(label)) for label in labels]
+    if not labels:
+        return f'<div class="monthly-summary-item"><span>{html.escape(empty_message)}</span><span></span></div>'
+
+    values = format_brl_series(values).tolist()
+    if deltas is None:
+        delta_html = [""] * len(labels)
+    else:
+        deltas = pd.Series(deltas, dtype="float64")
+        classes = np.select([deltas > 0, deltas < 0], ["positivo", "negativo"], "neutro")
+        delta_html = [
+            f'<span class="monthly-summary-delta {cls}">{text}</span>'
+            for cls, text in zip(classes, format_delta_series(deltas))
+        ]
+
+    items = "".join(
+        f'<div class="monthly-summary-item"><span class="monthly-summary-month">{label}</span>'
+        f'<span class="monthly-summary-value">{value}{delta}</span></div>'
+        for label, value, delta in zip(labels, values, delta_html)
+    )
+    return f'<div class="monthly-summary-list">{items}</div>'
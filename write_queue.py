@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from snapshot_store import start_background
+
+logger = logging.getLogger(__name__)
+
+
+# --- Fila de Gravação de Vendas ---
+class SalesWriteQueue:
+    """Fila de vendas com log em disco (JSONL) e envio em lote para a planilha em segundo plano.
+
+    `enqueue` grava a linha no log com fsync e retorna na hora; uma thread junta as linhas
+    pendentes e chama `flush(rows)` (ex.: worksheet.append_rows), com backoff exponencial
+    quando a API falha. Linhas enviadas continuam na fila como "não vistas" até a próxima
+    releitura da planilha (`acknowledge_reload`), para que o app possa sobrepô-las ao
+    DataFrame em cache sem baixar tudo de novo. Após um restart o log é reaplicado.
+    """
+
+    def __init__(self, path, flush, batch_size=50, batch_window=0.5, base_delay=2.0, max_delay=300.0):
+        self.path = path
+        self.flush = flush
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.last_error = None
+        self.last_flush_at = None
+        self._entries = []
+        self._cond = threading.Condition()
+        self._replay()
+        self._thread = start_background(self._run, "fila-vendas")
+
+    # --- Log em disco ---
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        entries = {}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última linha cortada por uma queda no meio da gravação
+                    logger.warning("Linha inválida ignorada no log %s.", self.path)
+                    continue
+                if record["op"] == "add":
+                    entries[record["id"]] = {"id": record["id"], "row": record["row"], "flushed_at": None}
+                elif record["op"] == "flushed":
+                    for entry_id in record["ids"]:
+                        if entry_id in entries:
+                            entries[entry_id]["flushed_at"] = record["ts"]
+        self._entries = list(entries.values())
+
+    def _append_log(self, records):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact(self):
+        """Reescreve o log só com as entradas ainda na fila (chamado com o lock)."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._entries:
+                f.write(json.dumps({"op": "add", "id": entry["id"], "row": entry["row"]}, ensure_ascii=False) + "\n")
+                if entry["flushed_at"] is not None:
+                    f.write(json.dumps({"op": "flushed", "ids": [entry["id"]], "ts": entry["flushed_at"]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    # --- API ---
+    def enqueue(self, row):
+        """Registra a linha de forma durável e agenda o envio. Retorna o id da entrada."""
+        entry = {"id": uuid.uuid4().hex, "row": list(row), "flushed_at": None}
+        with self._cond:
+            self._append_log([{"op": "add", "id": entry["id"], "row": entry["row"]}])
+            self._entries.append(entry)
+            self._cond.notify()
+        return entry["id"]
+
+    def overlay_entries(self):
+        """Pares (id, linha) ainda não vistos em uma releitura da planilha (pendentes e já enviados), em ordem."""
+        with self._cond:
+            return [(entry["id"], list(entry["row"])) for entry in self._entries]
+
+    def acknowledge_reload(self, loaded_at):
+        """Descarta as entradas enviadas antes de `loaded_at`: a releitura que começou nesse instante já as contém."""
+        with self._cond:
+            seen = {e["id"] for e in self._entries if e["flushed_at"] is not None and e["flushed_at"] <= loaded_at}
+            if not seen:
+                return 0
+            self._entries = [e for e in self._entries if e["id"] not in seen]
+            self._compact()
+        return len(seen)
+
+    def status(self):
+        """Contagem de entradas pendentes/enviadas e último erro de envio."""
+        with self._cond:
+            pending = sum(1 for e in self._entries if e["flushed_at"] is None)
+            return {"pendentes": pending, "enviadas": len(self._entries) - pending, "erro": self.last_error}
+
+    # --- Envio em segundo plano ---
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                while not any(e["flushed_at"] is None for e in self._entries):
+                    self._cond.wait()
+            # Espera um pouco para juntar registros feitos em sequência no mesmo lote
+            time.sleep(self.batch_window)
+            with self._cond:
+                batch = [e for e in self._entries if e["flushed_at"] is None][:self.batch_size]
+            try:
+                self.flush([list(e["row"]) for e in batch])
+            except Exception as e:
+                failures += 1
+                self.last_error = str(e)
+                delay = min(self.base_delay * 2 ** (failures - 1), self.max_delay) * random.uniform(0.8, 1.2)
+                logger.warning("Falha ao enviar %d venda(s) (tentativa %d); nova tentativa em %.0fs: %s", len(batch), failures, delay, e)
+                time.sleep(delay)
+                continue
+            failures = 0
+            self.last_error = None
+            now = time.time()
+            with self._cond:
+                ids = [e["id"] for e in batch]
+                self._append_log([{"op": "flushed", "ids": ids, "ts": now}])
+                for entry in batch:
+                    entry["flushed_at"] = now
+                self.last_flush_at = now